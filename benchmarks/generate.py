@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cougargrades import synthetic
+
+parser = argparse.ArgumentParser(description='Generate deterministic grades CSV files in the FOIA layout at any scale')
+parser.add_argument('out', metavar='grades.csv', type=str,
+                    help='CSV file to write, or the folder to write grades-01.csv, grades-02.csv, ... into with --files')
+parser.add_argument('--rows', dest='rows', type=int, default=10000,
+                    help='Data rows to generate, for example 10000 to 5000000 (default: 10000)')
+parser.add_argument('--files', dest='files', type=int, default=1,
+                    help='Split the terms over N files in chronological order, like the FOIA releases (default: 1)')
+parser.add_argument('--terms', dest='terms', type=int, default=30,
+                    help='Consecutive terms of grade data, starting with Spring 2012 (default: 30)')
+parser.add_argument('--seed', dest='seed', type=int, default=1430)
+args = parser.parse_args()
+
+if args.files < 1 or args.rows < 1 or args.terms < 1:
+    print(f'--rows, --files and --terms must be at least 1')
+    exit(1)
+
+if args.files == 1:
+    paths = [args.out]
+else:
+    os.makedirs(args.out, exist_ok=True)
+    paths = [os.path.join(args.out, f'grades-{i + 1:02}.csv') for i in range(args.files)]
+
+start = time.perf_counter()
+written = synthetic.generate(paths, args.rows, seed=args.seed, terms=args.terms)
+seconds = time.perf_counter() - start
+for path, rows in zip(paths, written):
+    print(f'{path}: {rows} rows')
+print(f'{args.rows} rows generated in {seconds:.2f}s (seed {args.seed})')
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from cougargrades import cli
+from cougargrades import synthetic
+from cougargrades.fakestore import FakeClient
+
+parser = argparse.ArgumentParser(description='Run jsonl2firestore.py against an in-process fake Firestore and report its RPC cost')
+parser.add_argument('--rows', dest='rows', type=int, default=3000,
+                    help='Rows of grade data to generate, see benchmarks/generate.py (default: 3000)')
+parser.add_argument('--terms', dest='terms', type=int, default=6,
+                    help='Terms of grade data (default: 6)')
+parser.add_argument('--latency', dest='latency', type=float, default=20,
+                    help='Milliseconds added to every fake RPC (default: 20)')
+parser.add_argument('--bundle', dest='bundle', action='store_true',
+                    help='Export with db2jsonl.py --bundle')
+parser.add_argument('--export', dest='export', default=None,
+                    help='Import this existing db2jsonl.py export (or records.db) instead of generating one')
+parser.add_argument('--json', dest='json', default=None,
+                    help='Also write the results to this JSON file')
+parser.add_argument('--max-rpcs-per-section', dest='max_rpcs', type=float, default=None,
+                    help='Exit with status 1 if the import needs more RPCs per section than this')
+parser.add_argument('--seed', dest='seed', type=int, default=1430)
+args, importer_args = parser.parse_known_args()
+
+results = {}
+with tempfile.TemporaryDirectory() as tmp:
+    export = args.export
+    if export is None:
+        synthetic.generate([os.path.join(tmp, 'grades.csv')], args.rows, seed=args.seed, terms=args.terms)
+        subprocess.run([sys.executable, os.path.join(ROOT, 'csv2db.py'), os.path.join(tmp, 'grades.csv'), '--out', os.path.join(tmp, 'records.db'), '--single-pass'],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        subprocess.run([sys.executable, os.path.join(ROOT, 'db2jsonl.py'), os.path.join(tmp, 'records.db'), '--out', os.path.join(tmp, 'export')] + (['--bundle'] if args.bundle else []),
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        export = os.path.join(tmp, 'export')
+    # jsonl2firestore.py with its own options, talking to the fake instead of a project
+    importer = argparse.ArgumentParser(prog='jsonl2firestore.py')
+    cli.jsonl2firestore_arguments(importer)
+    importer = importer.parse_args([export] + importer_args)
+    db = FakeClient(latency=args.latency / 1000)
+
+    start = time.perf_counter()
+    cli.jsonl2firestore(importer, connect=lambda: db)
+    seconds = time.perf_counter() - start
+
+sections = sum(1 for path in db.store if '/sections/' in path)
+results = {
+    "sections": sections,
+    "seconds": seconds,
+    "latencyMs": args.latency,
+    "importerArgs": importer_args,
+    **db.stats(),
+    "documentsPerSecond": db.writes / seconds,
+    "rpcsPerSection": db.rpcs / sections,
+    "readsPerSection": db.reads / sections,
+}
+print(f'{sections} sections in {seconds:.2f}s at {args.latency}ms per RPC {" ".join(importer_args)}')
+print(f'  {db.writes} writes, {db.reads} reads, {db.rpcs} RPCs')
+print(f'  {results["documentsPerSecond"]:,.0f} documents/sec, {results["rpcsPerSection"]:.3f} RPCs/section, {results["readsPerSection"]:.3f} reads/section')
+if args.json is not None:
+    with open(args.json, 'w') as f:
+        f.write(json.dumps(results, indent=2))
+if args.max_rpcs is not None and results["rpcsPerSection"] > args.max_rpcs:
+    print(f'{results["rpcsPerSection"]:.3f} RPCs per section is above --max-rpcs-per-section {args.max_rpcs}')
+    exit(1)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cougargrades import util
+
+FIRST = ['Michael', 'Jennifer', 'David', 'Maria', 'Jose', 'Giulia', 'De-Hua', 'Nguyen', 'Mary Jane', 'Jerry Osagie',
+         'Kevin Bernard', 'Marlon Antoine', 'Ana Lucia', 'Wei', 'Olufemi', 'Christopher', 'Elizabeth', 'Ali', 'Priya', 'Juan Carlos']
+LAST = ['Smith', 'Garcia', 'Nguyen', 'Johnson', 'Toti', 'Ebalunode', 'Han', 'Van Der Berg', 'De La Cruz', 'Thompson',
+        'Walker', 'Patel', 'Lopez-Martinez', 'Kim', 'Okafor', 'Williams', 'St John', 'Ramirez', 'Chen', 'Brown']
+
+# the keyword engine before caching and prefix sharing, kept here to check that the output is unchanged
+def reference(firstName, lastName):
+    fullName = f'{firstName} {lastName}'
+    k = len(fullName.split(' '))
+    permutations = util.generatePermutations(fullName) if k < 5 else util.generateConservativePermutations(firstName, lastName)
+    result = []
+    for p in permutations:
+        result += util.createKeywords(p)
+    return sorted(list(set(result)))
+
+def timed(fn, calls):
+    start = time.perf_counter()
+    for first, last in calls:
+        fn(first, last)
+    return time.perf_counter() - start
+
+parser = argparse.ArgumentParser(description='Micro-benchmark for util.generateKeywords')
+parser.add_argument('--names', dest='names', type=int, default=2000,
+                    help='Number of distinct instructors (default: 2000)')
+parser.add_argument('--sections', dest='sections', type=int, default=20,
+                    help='Average number of sections per instructor, each one is a lookup (default: 20)')
+parser.add_argument('--seed', dest='seed', type=int, default=1430)
+args = parser.parse_args()
+
+rng = random.Random(args.seed)
+names = sorted(set((rng.choice(FIRST), rng.choice(LAST)) for _ in range(args.names)))
+calls = [name for name in names for _ in range(rng.randint(1, 2 * args.sections - 1))]
+rng.shuffle(calls)
+
+for first, last in names:
+    assert util.generateKeywords(first, last) == reference(first, last), (first, last)
+util.cachedKeywords.cache_clear()
+
+print(f'{len(names)} distinct names, {len(calls)} lookups')
+before = timed(reference, calls)
+print(f'reference:        {before:.3f}s ({len(calls) / before:,.0f} lookups/sec)')
+util.cachedKeywords.cache_clear()
+cold = timed(util.generateKeywords, names)
+print(f'generateKeywords: {cold:.3f}s for every distinct name once, uncached ({len(names) / cold:,.0f} names/sec)')
+util.cachedKeywords.cache_clear()
+after = timed(util.generateKeywords, calls)
+print(f'generateKeywords: {after:.3f}s ({len(calls) / after:,.0f} lookups/sec, {before / after:.1f}x)')
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import compileall
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from cougargrades import synthetic
+
+# modules the quick commands must never load
+HEAVY = ['tqdm', 'halo', 'firebase_admin', 'google', 'grpc']
+
+parser = argparse.ArgumentParser(description='Measure the import time of the quick `python -m cougargrades` commands against a budget')
+parser.add_argument('--budget-ms', dest='budget', type=float, default=40,
+                    help='Exit with status 1 if a command spends more than this many milliseconds importing modules (default: 40)')
+parser.add_argument('--repeat', dest='repeat', type=int, default=5,
+                    help='Run every command N times and keep the fastest (default: 5)')
+parser.add_argument('--rows', dest='rows', type=int, default=2000,
+                    help='Rows of generated data the commands run on (default: 2000)')
+parser.add_argument('--json', dest='json', default=None,
+                    help='Also write the results to this JSON file')
+args = parser.parse_args()
+
+def imports(argv):
+    # => ({ module: self microseconds }, wall seconds) of one run of `argv` under -X importtime
+    start = time.perf_counter()
+    p = subprocess.run([sys.executable, '-X', 'importtime', *argv], cwd=ROOT, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if p.returncode != 0:
+        raise RuntimeError(f'{" ".join(argv)} failed with status {p.returncode}:\n{p.stdout}{p.stderr}')
+    modules = {}
+    for line in p.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if line.startswith('import time:') and not line.startswith('import time: self'):
+            own, cumulative, name = line[len('import time:'):].split('|')
+            modules[name.strip()] = int(own)
+    return modules, seconds
+
+# measured with up to date bytecode, like an installed package, not with compiling the sources
+compileall.compile_dir(os.path.join(ROOT, 'cougargrades'), quiet=1)
+
+results = []
+with tempfile.TemporaryDirectory() as tmp:
+    db = os.path.join(tmp, 'records.db')
+    export = os.path.join(tmp, 'export')
+    synthetic.generate([os.path.join(tmp, 'grades.csv')], args.rows)
+    for argv in [['csv2db', os.path.join(tmp, 'grades.csv'), '--out', db, '--single-pass', '--quiet'], ['db2jsonl', db, '--out', export, '--quiet']]:
+        subprocess.run([sys.executable, '-m', 'cougargrades', *argv], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    with open(os.path.join(export, 'catalog', sorted(os.listdir(os.path.join(export, 'catalog')))[0])) as f:
+        header = json.loads(f.readline())
+
+    commands = {
+        "help": ['--help'],
+        "status records.db": ['status', db],
+        "status export": ['status', export],
+        "course": ['course', db, f'{header["department"]} {header["catalogNumber"]}'],
+        "jsonl2firestore --dry-run": ['jsonl2firestore', export, '--dry-run', '--quiet',
+                                      '--journal', os.path.join(tmp, 'import.journal'), '--manifest', os.path.join(tmp, 'uploaded.json')],
+    }
+
+    # what the interpreter imports by itself is not the commands' doing
+    baseline = set()
+    startup = None
+    for _ in range(args.repeat):
+        modules, seconds = imports(['-c', 'pass'])
+        baseline |= set(modules)
+        startup = seconds if startup is None else min(startup, seconds)
+    print(f'Interpreter startup: {startup * 1000:.0f}ms, {len(baseline)} modules')
+
+    failed = 0
+    for name, argv in commands.items():
+        best = None
+        for _ in range(args.repeat):
+            modules, seconds = imports(['-m', 'cougargrades', *argv])
+            own = { module: us for module, us in modules.items() if module not in baseline }
+            ms = sum(own.values()) / 1000
+            if best is None or ms < best["importMs"]:
+                best = {
+                    "command": name,
+                    "importMs": ms,
+                    "modules": len(own),
+                    "wallMs": seconds * 1000,
+                    "heavy": sorted(module for module in own if module.split('.')[0] in HEAVY),
+                    "slowest": sorted(own, key=own.get, reverse=True)[:5],
+                }
+        results += [best]
+        over = best["importMs"] > args.budget
+        print(f'  {name}: {best["importMs"]:.1f}ms importing {best["modules"]} modules, {best["wallMs"]:.0f}ms in total{" <= over budget" if over else ""}')
+        if over:
+            print(f'    slowest: {", ".join(best["slowest"])}')
+        if best["heavy"]:
+            print(f'    loads {", ".join(best["heavy"][:5])}')
+        if over or best["heavy"]:
+            failed += 1
+
+if args.json is not None:
+    with open(args.json, 'w') as f:
+        f.write(json.dumps({ "budgetMs": args.budget, "startupMs": startup * 1000, "results": results }, indent=2))
+if failed > 0:
+    print(f'{failed} commands went over the {args.budget:.0f}ms import budget or loaded {", ".join(HEAVY)}')
+    exit(1)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from cougargrades import synthetic
+
+# stage => the stage whose output it reads, in the order they run
+STAGES = {
+    "csv2db": None,
+    "csv2db-legacy": None,
+    "db2jsonl": "csv2db",
+    "db2jsonl-bundle": "csv2db",
+    "importer": "db2jsonl",
+}
+
+parser = argparse.ArgumentParser(description='Time every stage on generated data at several scales and record the results as JSON')
+parser.add_argument('--scales', dest='scales', default='10000,100000',
+                    help='Comma separated row counts to generate, for example 10000,100000,1000000,5000000 (default: 10000,100000)')
+parser.add_argument('--stages', dest='stages', default='csv2db,db2jsonl,db2jsonl-bundle,importer',
+                    help=f'Comma separated stages to time out of {",".join(STAGES)} (default: csv2db,db2jsonl,db2jsonl-bundle,importer)')
+parser.add_argument('--files', dest='files', type=int, default=1,
+                    help='Generate every scale as N CSV files (default: 1)')
+parser.add_argument('--jobs', dest='jobs', type=int, default=1,
+                    help='Pass --jobs N to csv2db.py and db2jsonl.py (default: 1)')
+parser.add_argument('--latency', dest='latency', type=float, default=5,
+                    help='Milliseconds added to every fake Firestore RPC of the importer stage (default: 5)')
+parser.add_argument('--repeat', dest='repeat', type=int, default=1,
+                    help='Run every stage N times and keep the fastest (default: 1)')
+parser.add_argument('--json', dest='json', default=None,
+                    help='Write the results to this JSON file')
+parser.add_argument('--compare', dest='compare', default=None,
+                    help='Results JSON of an earlier run, exit with status 1 if a stage got slower than --max-regression')
+parser.add_argument('--max-regression', dest='max_regression', type=float, default=0.2,
+                    help='Allowed slowdown against --compare as a fraction (default: 0.2)')
+parser.add_argument('--noise', dest='noise', type=float, default=0.25,
+                    help='Slowdowns under this many seconds are never regressions (default: 0.25)')
+parser.add_argument('--keep', dest='keep', default=None,
+                    help='Keep the generated CSV files and every output in this folder')
+parser.add_argument('--seed', dest='seed', type=int, default=1430)
+args = parser.parse_args()
+
+try:
+    scales = [int(scale) for scale in args.scales.split(',')]
+except ValueError:
+    print(f'--scales must be comma separated row counts')
+    exit(1)
+stages = args.stages.split(',')
+for stage in stages:
+    if stage not in STAGES:
+        print(f'Unknown stage {stage}, choose from {",".join(STAGES)}')
+        exit(1)
+
+if args.repeat < 1:
+    print(f'--repeat must be at least 1')
+    exit(1)
+
+previous = None
+if args.compare is not None:
+    try:
+        with open(args.compare) as f:
+            previous = json.loads(f.read())
+    except (OSError, ValueError) as err:
+        print(f'Cannot read --compare results: {err}')
+        exit(1)
+
+def measure(argv):
+    # => (seconds, peak RSS in MB or None) of one run of `argv`, its output is discarded
+    start = time.perf_counter()
+    p = subprocess.Popen(argv, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if hasattr(os, 'wait4'):
+        # reaped here instead of by Popen, wait4() is what reports the peak RSS of the child
+        stderr = p.stderr.read()
+        _, status, usage = os.wait4(p.pid, 0)
+        p.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    else:
+        stderr = p.communicate()[1]
+        rss = None
+    seconds = time.perf_counter() - start
+    if p.returncode != 0:
+        raise RuntimeError(f'{" ".join(argv)} failed with status {p.returncode}:\n{stderr.decode(errors="replace")}')
+    return seconds, rss
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def command(stage, folder, csvfiles):
+    # => (argv, file of the importer's own results or None) of `stage`, its outputs go to `folder`
+    db = os.path.join(folder, 'records.db')
+    if stage == "csv2db":
+        return [sys.executable, os.path.join(ROOT, 'csv2db.py'), *csvfiles, '--out', db, '--single-pass', '--jobs', str(args.jobs)], None
+    if stage == "csv2db-legacy":
+        return [sys.executable, os.path.join(ROOT, 'csv2db.py'), *csvfiles, '--out', os.path.join(folder, 'legacy.db')], None
+    if stage == "db2jsonl":
+        return [sys.executable, os.path.join(ROOT, 'db2jsonl.py'), db, '--out', os.path.join(folder, 'export'), '--jobs', str(args.jobs)], None
+    if stage == "db2jsonl-bundle":
+        return [sys.executable, os.path.join(ROOT, 'db2jsonl.py'), db, '--out', os.path.join(folder, 'bundle'), '--bundle', '--jobs', str(args.jobs)], None
+    # the journal and manifest stay out of the export, so every repeat is a fresh import
+    stats = os.path.join(folder, 'importer.json')
+    return [sys.executable, os.path.join(ROOT, 'benchmarks', 'importer.py'), '--export', os.path.join(folder, 'export'),
+            '--latency', str(args.latency), '--json', stats,
+            '--journal', os.path.join(folder, f'import-{time.time_ns()}.journal'), '--manifest', os.path.join(folder, 'uploaded.json')], stats
+
+def run_scale(rows, folder):
+    # => results of every selected stage at `rows` rows
+    results = []
+    if args.files == 1:
+        csvfiles = [os.path.join(folder, 'grades.csv')]
+    else:
+        csvfiles = [os.path.join(folder, f'grades-{i + 1:02}.csv') for i in range(args.files)]
+    start = time.perf_counter()
+    synthetic.generate(csvfiles, rows, seed=args.seed)
+    print(f'{rows} rows generated in {time.perf_counter() - start:.2f}s')
+    done = set()
+    def run(stage):
+        if stage in done:
+            return
+        if STAGES[stage] is not None:
+            # prerequisites run once and are only recorded when they were asked for
+            run(STAGES[stage])
+        best = None
+        for _ in range(args.repeat if stage in stages else 1):
+            argv, stats = command(stage, folder, csvfiles)
+            seconds, rss = measure(argv)
+            if best is None or seconds < best["seconds"]:
+                best = { "scale": rows, "stage": stage, "seconds": seconds, "rowsPerSecond": rows / seconds, "peakRssMb": rss }
+                if stats is not None:
+                    with open(stats) as f:
+                        importer = json.loads(f.read())
+                    best.update({ "sections": importer["sections"], "latencyMs": importer["latencyMs"], "rpcs": importer["rpcs"],
+                                  "writes": importer["writes"], "reads": importer["reads"], "rpcsPerSection": importer["rpcsPerSection"] })
+        done.add(stage)
+        if stage in stages:
+            results.append(best)
+            rss = f', {best["peakRssMb"]:.0f} MB peak RSS' if best["peakRssMb"] is not None else ''
+            rpcs = f', {best["rpcs"]} RPCs' if "rpcs" in best else ''
+            print(f'  {stage}: {best["seconds"]:.2f}s, {best["rowsPerSecond"]:,.0f} rows/sec{rss}{rpcs}')
+    for stage in STAGES:
+        if stage in stages:
+            run(stage)
+    return results
+
+results = []
+for rows in scales:
+    if args.keep is not None:
+        folder = os.path.join(args.keep, str(rows))
+        # outputs of an earlier run would turn csv2db and db2jsonl into no-ops
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+        results += run_scale(rows, folder)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            results += run_scale(rows, tmp)
+
+report = {
+    "version": 1,
+    "commit": git_commit(),
+    "python": platform.python_version(),
+    "platform": platform.platform(),
+    "seed": args.seed,
+    "jobs": args.jobs,
+    "results": results,
+}
+if args.json is not None:
+    with open(args.json, 'w') as f:
+        f.write(json.dumps(report, indent=2))
+
+if previous is not None:
+    before = { (r["scale"], r["stage"]): r for r in previous["results"] }
+    regressions = 0
+    print(f'Compared with {previous.get("commit") or args.compare}:')
+    for r in results:
+        old = before.get((r["scale"], r["stage"]))
+        if old is None:
+            continue
+        change = r["seconds"] / old["seconds"] - 1
+        slower = change > args.max_regression and r["seconds"] - old["seconds"] > args.noise
+        # the RPC count of an import is deterministic, any increase is a regression
+        more_rpcs = "rpcs" in r and "rpcs" in old and r["rpcs"] > old["rpcs"]
+        flag = ' <= regression' if slower or more_rpcs else ''
+        print(f'  {r["scale"]} {r["stage"]}: {old["seconds"]:.2f}s => {r["seconds"]:.2f}s ({change:+.0%}){flag}')
+        if more_rpcs:
+            print(f'    {old["rpcs"]} => {r["rpcs"]} RPCs')
+        if flag:
+            regressions += 1
+    if regressions > 0:
+        print(f'{regressions} stages regressed by more than {args.max_regression:.0%}')
+        exit(1)
@@ -0,0 +1,3 @@
+from cougargrades import cli
+
+cli.main()
@@ -0,0 +1,136 @@
+import time
+import random
+import threading
+
+from cougargrades import metrics
+
+# Firestore rejects commits with more than 500 writes
+MAX_BATCH_SIZE = 500
+
+def errors():
+    # => (retryable, throttling) exception types, the Google client libraries are only loaded once something is committed
+    from google.api_core import exceptions
+    # the commit was rejected as a whole (contention, quota, unreachable backend), so sending it again is safe
+    retryable = (exceptions.Aborted, exceptions.ResourceExhausted, exceptions.ServiceUnavailable)
+    # the backend is telling us to slow down, so every writer sharing the limiter backs off
+    throttling = (exceptions.Aborted, exceptions.ResourceExhausted)
+    return retryable, throttling
+
+class TokenBucket:
+    # writes/second shared by every BatchWriter of an import, safe to use from several threads.
+    # The rate adapts: it is halved whenever Firestore pushes back and grows back by 5% per
+    # successful commit, up to the configured rate.
+    def __init__(self, rate, minimum=1.0):
+        self.max_rate = float(rate)
+        self.minimum = min(float(minimum), self.max_rate)
+        self.rate = self.max_rate
+        # a full second of writes can go out at once, but never less than one full batch
+        self.capacity = max(self.max_rate, MAX_BATCH_SIZE)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, n):
+        # blocks until `n` writes may be sent
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                wait = (n - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttle(self):
+        with self.lock:
+            self.rate = max(self.minimum, self.rate / 2)
+            # tokens saved up at the old rate are not spent at once
+            self.tokens = min(self.tokens, self.rate)
+
+    def recover(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate * 1.05)
+
+class BatchWriter:
+    # queues set()/update() calls and commits them as WriteBatches of up to `size` writes.
+    # Batches are committed one after another in the order the writes were queued, so a document
+    # created by set() is always in place before a later update() touches it.
+    def __init__(self, db, size=MAX_BATCH_SIZE, retries=5, backoff=1.0, limiter=None, on_commit=None):
+        if not 0 < size <= MAX_BATCH_SIZE:
+            raise ValueError(f'batch size must be between 1 and {MAX_BATCH_SIZE}, got {size}')
+        self.db = db
+        self.size = size
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = limiter
+        # called with the marks queued up to a commit, once that commit succeeded
+        self.on_commit = on_commit
+        self.ops = []
+        self.marks = []
+        # totals, for progress reporting
+        self.commits = 0
+        self.writes = 0
+
+    def set(self, ref, data, merge=False):
+        self._queue(('set', ref, data, { "merge": merge }))
+
+    def update(self, ref, data):
+        self._queue(('update', ref, data, {}))
+
+    def mark(self, marker):
+        # `marker` is reported to on_commit once every write queued before it is committed
+        self.marks += [marker]
+
+    def _queue(self, op):
+        self.ops += [op]
+        if len(self.ops) >= self.size:
+            self.flush()
+
+    def flush(self):
+        if not self.ops:
+            self._committed()
+            return
+        retryable, throttling = errors()
+        attempt = 0
+        while True:
+            # a fresh WriteBatch per attempt, so nothing of a failed attempt is carried over
+            batch = self.db.batch()
+            for method, ref, data, kwargs in self.ops:
+                getattr(batch, method)(ref, data, **kwargs)
+            if self.limiter is not None:
+                self.limiter.acquire(len(self.ops))
+            try:
+                metrics.count('rpcs')
+                batch.commit()
+                break
+            except retryable as err:
+                metrics.count('retries')
+                if self.limiter is not None and isinstance(err, throttling):
+                    self.limiter.throttle()
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                # exponential backoff with jitter, capped at a minute
+                time.sleep(min(60, self.backoff * 2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+        if self.limiter is not None:
+            self.limiter.recover()
+        self.commits += 1
+        self.writes += len(self.ops)
+        metrics.count('writes', len(self.ops))
+        self.ops = []
+        self._committed()
+
+    def _committed(self):
+        if self.marks and self.on_commit is not None:
+            self.on_commit(self.marks)
+        self.marks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # queued writes are only committed when the import got through without an error
+        if exc_type is None:
+            self.flush()
@@ -0,0 +1,96 @@
+import os
+import json
+import mmap
+
+# A bundle is one JSONL data file holding many entries back to back plus an offset index next to it:
+#   catalog.jsonl      header and section lines of every course, one course after the other
+#   catalog.jsonl.idx  {"version": 1, "rows": 1234, "entries": [["COSC 1430", offset, length, lines], ...]}
+# Entries keep the order they were written in, so a bundle streams like the folder of files it replaces.
+INDEX_VERSION = 1
+
+def index_path(path):
+    return f'{path}.idx'
+
+class BundleWriter:
+    def __init__(self, path):
+        self.path = path
+        self.entries = []
+        self.rows = 0
+        self.offset = 0
+        # written under a temporary name, a bundle only appears once its index is complete
+        self.f = open(f'{path}.tmp', 'wb')
+
+    def add(self, key, lines):
+        # lines: JSONL text of one entry, every line terminated by '\n', may be a generator
+        length = 0
+        count = 0
+        for line in lines:
+            data = line.encode('utf-8')
+            self.f.write(data)
+            length += len(data)
+            count += 1
+        self.entries += [[key, self.offset, length, count]]
+        self.offset += length
+        self.rows += count
+
+    def close(self):
+        self.f.close()
+        with open(f'{index_path(self.path)}.tmp', 'w') as f:
+            f.write(json.dumps({ "version": INDEX_VERSION, "rows": self.rows, "entries": self.entries }, separators=(',', ':')))
+        os.replace(f'{self.path}.tmp', self.path)
+        os.replace(f'{index_path(self.path)}.tmp', index_path(self.path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class BundleReader:
+    def __init__(self, path):
+        self.path = path
+        with open(index_path(path), 'r') as f:
+            index = json.loads(f.read())
+        if index["version"] != INDEX_VERSION:
+            raise ValueError(f'{index_path(path)} has index version {index["version"]}, expected {INDEX_VERSION}')
+        # counting rows never touches the data file
+        self.rows = index["rows"]
+        self.entries = { key: (offset, length, lines) for key, offset, length, lines in index["entries"] }
+        self.order = [entry[0] for entry in index["entries"]]
+        self.f = open(path, 'rb')
+        # mmap() refuses empty files
+        self.data = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) > 0 else b''
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def keys(self):
+        return list(self.order)
+
+    def count(self, key):
+        return self.entries[key][2]
+
+    def lines(self, key):
+        # the raw JSONL lines of one entry, sliced straight out of the mapped file
+        offset, length, lines = self.entries[key]
+        return self.data[offset:offset + length].decode('utf-8').splitlines(keepends=True)
+
+    def get(self, key):
+        # one entry as a list of parsed objects, None if the key is unknown
+        if key not in self.entries:
+            return None
+        return [json.loads(line) for line in self.lines(key)]
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
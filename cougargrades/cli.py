@@ -0,0 +1,393 @@
+import os
+import os.path
+import json
+import argparse
+import datetime
+
+from cougargrades import paths
+from cougargrades import metrics
+from cougargrades.batch import MAX_BATCH_SIZE
+
+# The commands behind csv2db.py, db2jsonl.py, jsonl2firestore.py and pipeline.py, also run as `python -m cougargrades <command>`.
+# Every command imports the stage it runs when it runs, so quick invocations (status, course, --dry-run) start
+# without loading tqdm, halo or the Firebase SDK. benchmarks/startup.py holds them to an import-time budget.
+
+def metrics_arguments(parser, recorded):
+    parser.add_argument('--metrics', dest='metrics', default=None,
+                        help=f'Write the time, rows/sec, {recorded} of every phase to this JSON file')
+    parser.add_argument('--quiet', dest='quiet', action='store_true',
+                        help='No progress bars or spinners, for logs of non-interactive runs')
+
+def upload_arguments(parser, journal_default, manifest_default):
+    # the flags jsonl2firestore.py and pipeline.py share
+    parser.add_argument('--skip-existing', dest='skip_existing', action='store_true',
+                        help='Leave sections that already exist in Firestore untouched instead of overwriting them')
+    parser.add_argument('--workers', dest='workers', type=int, default=1,
+                        help='Upload courses in N threads, each committing its own batches (default: 1)')
+    parser.add_argument('--rate', dest='rate', type=float, default=None,
+                        help='Maximum writes/second across all workers, lowered automatically while Firestore pushes back (default: unlimited)')
+    parser.add_argument('--batch-size', dest='batch_size', type=int, default=MAX_BATCH_SIZE,
+                        help=f'Writes per WriteBatch commit (default: {MAX_BATCH_SIZE})')
+    parser.add_argument('--journal', dest='journal', default=None,
+                        help=f'SQLite file recording committed courses and instructors (default: {journal_default})')
+    parser.add_argument('--resume', dest='resume', action='store_true',
+                        help='Continue the import recorded in --journal, skipping everything it lists as committed')
+    parser.add_argument('--since', dest='since', default=None,
+                        help='Manifest of the last upload, only what changed since then is written')
+    parser.add_argument('--manifest', dest='manifest', default=None,
+                        help=f'Where to save the manifest of this upload (default: {manifest_default})')
+
+def check_upload_arguments(args):
+    if args.workers < 1:
+        print(f'--workers must be at least 1')
+        exit(1)
+
+    if args.rate is not None and args.rate <= 0:
+        print(f'--rate must be positive')
+        exit(1)
+
+    if not 0 < args.batch_size <= MAX_BATCH_SIZE:
+        print(f'--batch-size must be between 1 and {MAX_BATCH_SIZE}')
+        exit(1)
+
+def firebase(key):
+    # => a Firestore client factory for the service account `key`, the Firebase SDK is only imported once it is called
+    def connect():
+        import firebase_admin
+        from firebase_admin import credentials
+        from firebase_admin import firestore
+        # prepare Firebase, use a service account
+        cred = credentials.Certificate(key)
+        firebase_admin.initialize_app(cred)
+        return firestore.client()
+    return connect
+
+def run(args, stage):
+    # runs `stage` with the --metrics and --quiet of `args`, a ValueError is printed and ends the command
+    metrics.configure(enabled=args.metrics is not None, quiet=args.quiet)
+    try:
+        stage()
+    except ValueError as err:
+        print(err)
+        exit(1)
+    finally:
+        if args.metrics is not None:
+            metrics.save(args.metrics)
+
+def csv2db_arguments(parser):
+    parser.add_argument('csvfiles', metavar='grades.csv', type=str, nargs='+',
+                        help='A set of CSV files to source data from')
+    parser.add_argument('--out', dest='outfile', default='records.db',
+                        help='SQLite db file to create')
+    parser.add_argument('--bulk', dest='bulk', action='store_true',
+                        help='Insert rows in chunks with executemany() inside a single transaction')
+    parser.add_argument('--single-pass', dest='single_pass', action='store_true',
+                        help='Normalize and derive every column while copying rows into indexed courses, instructors and sections tables behind a `records` view (implies --bulk)')
+    parser.add_argument('--append', dest='append', action='store_true',
+                        help='Only ingest new or changed CSV files into an existing --out database (implies --single-pass)')
+    parser.add_argument('--chunk-size', dest='chunk_size', type=int, default=10000,
+                        help='Rows per executemany() call in --bulk mode (default: 10000)')
+    parser.add_argument('--jobs', dest='jobs', type=int, default=1,
+                        help='Parse and normalize CSV files in N worker processes (implies --bulk)')
+    parser.add_argument('--journal-mode', dest='journal_mode', default=None,
+                        choices=['DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'],
+                        help='PRAGMA journal_mode used while ingesting in --bulk mode (default: MEMORY, DELETE when appending to an existing database)')
+    parser.add_argument('--synchronous', dest='synchronous', default=None,
+                        choices=['OFF', 'NORMAL', 'FULL', 'EXTRA'],
+                        help='PRAGMA synchronous used while ingesting in --bulk mode (default: OFF, FULL when appending to an existing database)')
+    parser.add_argument('--cache-size', dest='cache_size', type=int, default=-65536,
+                        help='PRAGMA cache_size used while ingesting in --bulk mode, negative values are KiB (default: -65536)')
+    metrics_arguments(parser, 'peak RSS and SQLite statement timings')
+
+def csv2db(args):
+    from cougargrades import database
+    run(args, lambda: database.build(args.csvfiles, args.outfile, bulk=args.bulk, single_pass=args.single_pass, append=args.append,
+                                     chunk_size=args.chunk_size, jobs=args.jobs, journal_mode=args.journal_mode,
+                                     synchronous=args.synchronous, cache_size=args.cache_size))
+
+def db2jsonl_arguments(parser):
+    parser.add_argument('dbfile', metavar='records.db', type=str,
+                        help='Path to the SQLite database generated by csv2db.py')
+    parser.add_argument('--out', dest='folder', default=None,
+                        help='Folder to store .jsonl files in')
+    parser.add_argument('--jobs', dest='jobs', type=int, default=1,
+                        help='Export departments in N worker processes')
+    parser.add_argument('--incremental', dest='incremental', action='store_true',
+                        help='Only re-export courses and instructors whose rows changed since the last export into the folder')
+    parser.add_argument('--bundle', dest='bundle', action='store_true',
+                        help='Write catalog.jsonl and instructors.jsonl with offset indexes instead of one file per course and instructor')
+    metrics_arguments(parser, 'peak RSS and SQLite statement timings')
+
+def db2jsonl(args):
+    # check arguments
+    if not os.path.isfile(args.dbfile):
+        print(f'{args.dbfile} is not a file.')
+        exit(1)
+
+    if args.folder == None:
+        print(f'--out must be a folder name.')
+        exit(1)
+    elif args.bundle and args.incremental:
+        # a bundle is rewritten as a whole, there are no per-course files to skip
+        print(f'--incremental cannot be combined with --bundle.')
+        exit(1)
+
+    from cougargrades import export
+    run(args, lambda: export.export(args.dbfile, args.folder, jobs=args.jobs, incremental=args.incremental, bundle=args.bundle))
+
+def jsonl2firestore_arguments(parser):
+    parser.add_argument('folder', metavar='records.db', type=str,
+                        help='Folder where .jsonl files (or a db2jsonl.py --bundle export) are stored, or a records.db to export while uploading.')
+    parser.add_argument('--key', dest='key', default=None,
+                        help='Path to Firebase Service account private key (see: README) ')
+    upload_arguments(parser, '[folder]/import.journal', '[folder]/uploaded.json')
+    parser.add_argument('--dry-run', dest='dry_run', action='store_true',
+                        help='Print the planned changes and their estimated Firestore reads and writes, then exit')
+    metrics_arguments(parser, 'peak RSS and Firestore RPC counts')
+
+def jsonl2firestore(args, connect=None):
+    # connect: Firestore client factory to upload with instead of the --key service account, such as a fakestore.FakeClient
+    if connect is None and not args.dry_run and (args.key == None or not os.path.isfile(args.key)):
+        print(f'{args.key} is not a file')
+        exit(1)
+
+    check_upload_arguments(args)
+
+    if args.folder == None:
+        print(f'[folder] must be a folder name.')
+        exit(1)
+    elif not os.path.isfile(args.folder) and not os.path.isfile(os.path.join(args.folder, 'catalog.jsonl')):
+        # a folder of .jsonl files, a records.db or a db2jsonl.py --bundle export is checked when it is opened
+        for path in paths.missing_folders(args.folder):
+            if path == args.folder:
+                print(f'A folder was not found at: {args.folder}')
+            else:
+                print(f'A `{os.path.basename(path)}` folder was not found under: {args.folder}')
+
+    from cougargrades.source import open_source
+    from cougargrades import upload
+
+    # the journal and manifest live next to a records.db
+    dbfile = args.folder if os.path.isfile(args.folder) else None
+    folder = args.folder if dbfile is None else None
+
+    def stage():
+        source = open_source(args.folder)
+        try:
+            upload.upload(source, connect if connect is not None else firebase(args.key),
+                          journal_path=args.journal if args.journal is not None else paths.journal_path(folder, dbfile),
+                          manifest_path=args.manifest if args.manifest is not None else paths.manifest_path(folder, dbfile),
+                          since=args.since, resume=args.resume, dry_run=args.dry_run, workers=args.workers, rate=args.rate,
+                          batch_size=args.batch_size, skip_existing=args.skip_existing)
+        finally:
+            source.close()
+    run(args, stage)
+
+def pipeline_arguments(parser):
+    parser.add_argument('csvfiles', metavar='grades.csv', type=str, nargs='+',
+                        help='A set of CSV files to source data from')
+    parser.add_argument('--db', dest='dbfile', default=None,
+                        help='Keep the SQLite db file at this path (default: a temporary file)')
+    parser.add_argument('--append', dest='append', action='store_true',
+                        help='Only ingest new or changed CSV files into an existing --db')
+    parser.add_argument('--out', dest='folder', default=None,
+                        help='Also write the .jsonl files to this folder, the upload then reads them (default: no export)')
+    parser.add_argument('--bundle', dest='bundle', action='store_true',
+                        help='Write the --out folder as catalog.jsonl and instructors.jsonl with offset indexes')
+    parser.add_argument('--jobs', dest='jobs', type=int, default=1,
+                        help='Parse CSV files and export departments in N worker processes')
+    parser.add_argument('--key', dest='key', default=None,
+                        help='Upload to Firestore with this Firebase Service account private key (default: no upload)')
+    upload_arguments(parser, 'import.journal in --out, next to --db or here', 'uploaded.json in --out, next to --db or here')
+    parser.add_argument('--dry-run', dest='dry_run', action='store_true',
+                        help='Print the planned changes and their estimated Firestore reads and writes instead of uploading')
+    metrics_arguments(parser, 'peak RSS, SQLite statement timings and Firestore RPC counts')
+
+def pipeline(args):
+    if args.dbfile is None and args.folder is None and args.key is None and not args.dry_run:
+        print(f'Nothing to produce, pass --db, --out, --key or --dry-run')
+        exit(1)
+
+    if args.key is not None and not os.path.isfile(args.key):
+        print(f'{args.key} is not a file')
+        exit(1)
+
+    if args.append and args.dbfile is None:
+        print(f'--append needs the --db to append to')
+        exit(1)
+
+    if args.bundle and args.folder is None:
+        print(f'--bundle needs an --out folder')
+        exit(1)
+
+    if args.resume and args.dbfile is None and args.folder is None:
+        # the journal belongs to the export it was written for, a temporary database is a new one every time
+        print(f'--resume needs a --db or an --out folder')
+        exit(1)
+
+    check_upload_arguments(args)
+
+    from cougargrades import pipeline
+
+    upload_options = None
+    if args.key is not None or args.dry_run:
+        upload_options = {
+            "journal_path": args.journal if args.journal is not None else paths.journal_path(args.folder, args.dbfile),
+            "manifest_path": args.manifest if args.manifest is not None else paths.manifest_path(args.folder, args.dbfile),
+            "since": args.since,
+            "resume": args.resume,
+            "dry_run": args.dry_run,
+            "workers": args.workers,
+            "rate": args.rate,
+            "batch_size": args.batch_size,
+            "skip_existing": args.skip_existing
+        }
+
+    run(args, lambda: pipeline.pipeline(args.csvfiles, dbfile=args.dbfile, out=args.folder, bundle=args.bundle, append=args.append,
+                                        jobs=args.jobs, connect=firebase(args.key) if args.key is not None else None, upload_options=upload_options))
+
+def status_arguments(parser):
+    parser.add_argument('path', metavar='records.db', type=str,
+                        help='A records.db, a db2jsonl.py export folder or a --bundle export')
+    parser.add_argument('--json', dest='json', action='store_true',
+                        help='Print the status as JSON')
+
+def status(args):
+    if not os.path.exists(args.path):
+        print(f'{args.path} was not found')
+        exit(1)
+
+    from cougargrades.source import open_source, FolderSource, BundleSource
+    from cougargrades.journal import Journal
+    from cougargrades import delta
+
+    dbfile = args.path if os.path.isfile(args.path) else None
+    folder = args.path if dbfile is None else None
+    try:
+        source = open_source(args.path)
+    except (OSError, ValueError) as err:
+        print(f'{args.path} is not a records.db or an export: {err}')
+        exit(1)
+    report = {
+        "path": source.path,
+        "kind": "database" if dbfile is not None else "bundle" if isinstance(source, BundleSource) else "export",
+        "courses": len(source.keys()),
+        "latestTerm": source.meta.get("latestTerm"),
+    }
+    if isinstance(source, FolderSource):
+        report["instructors"] = len(os.listdir(os.path.join(folder, 'instructors')))
+    elif isinstance(source, BundleSource):
+        report["instructors"] = len(source.instructors.keys())
+    else:
+        c = source.export.conn.cursor()
+        c.execute('SELECT COUNT(*) FROM (SELECT DISTINCT INSTR_LAST_NAME, INSTR_FIRST_NAME FROM records)')
+        report["instructors"] = c.fetchone()[0]
+        report["rows"] = source.export.total_rows
+        c.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='source_files'")
+        if c.fetchone()[0] > 0:
+            c.execute('SELECT COUNT(*) FROM source_files')
+            report["sourceFiles"] = c.fetchone()[0]
+    source.close()
+
+    # the last upload of the export: its journal and its manifest
+    journal_path = paths.journal_path(folder, dbfile)
+    if os.path.isfile(journal_path):
+        journal = Journal(journal_path)
+        rate = journal.throughput('course')
+        report["journal"] = {
+            "courses": len(journal.committed('course')),
+            "instructors": len(journal.committed('instructor')),
+            "rowsPerSecond": rate,
+        }
+        journal.close()
+    manifest_path = paths.manifest_path(folder, dbfile)
+    if os.path.isfile(manifest_path):
+        try:
+            manifest = delta.load_manifest(manifest_path)
+            report["uploaded"] = {
+                "at": datetime.datetime.fromtimestamp(os.path.getmtime(manifest_path)).isoformat(timespec='seconds'),
+                "courses": len(manifest["courses"]),
+                "sections": sum(len(course["sections"]) for course in manifest["courses"].values()),
+                "instructors": len(manifest["instructors"]),
+            }
+        except ValueError as err:
+            report["uploaded"] = { "error": str(err) }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f'{report["path"]}: {report["kind"]} with {report["courses"]} courses and {report["instructors"]} instructors, latest term {report["latestTerm"]}')
+    if "rows" in report:
+        print(f'  {report["rows"]} rows' + (f' from {report["sourceFiles"]} CSV files' if "sourceFiles" in report else ''))
+    if "journal" in report:
+        print(f'  {journal_path}: {report["journal"]["courses"]} courses and {report["journal"]["instructors"]} instructors committed by the last import' +
+              (f' at {round(report["journal"]["rowsPerSecond"])} rows/s' if report["journal"]["rowsPerSecond"] is not None else ''))
+    if "uploaded" in report:
+        if "error" in report["uploaded"]:
+            print(f'  {manifest_path}: {report["uploaded"]["error"]}')
+        else:
+            print(f'  {manifest_path}: {report["uploaded"]["sections"]} sections in {report["uploaded"]["courses"]} courses and {report["uploaded"]["instructors"]} instructors uploaded, saved {report["uploaded"]["at"]}')
+    else:
+        print(f'  nothing uploaded yet, {manifest_path} does not exist')
+
+def course_arguments(parser):
+    parser.add_argument('dbfile', metavar='records.db', type=str,
+                        help='Path to the SQLite database generated by csv2db.py')
+    parser.add_argument('courses', metavar='course', type=str, nargs='+',
+                        help='Courses to export, such as "COSC 1430"')
+    parser.add_argument('--out', dest='folder', default=None,
+                        help='Rewrite the catalog/ files of the courses in this db2jsonl.py export, instructor files are left as they are (default: print the .jsonl lines)')
+
+def course(args):
+    if not os.path.isfile(args.dbfile):
+        print(f'{args.dbfile} is not a file.')
+        exit(1)
+
+    if args.folder is not None:
+        if os.path.isfile(os.path.join(args.folder, 'catalog.jsonl')):
+            # a bundle is rewritten as a whole
+            print(f'{args.folder} is a --bundle export, re-export it with db2jsonl.py --bundle')
+            exit(1)
+        if paths.missing_folders(args.folder):
+            print(f'{args.folder} is not a db2jsonl.py export folder')
+            exit(1)
+
+    from cougargrades import export
+
+    for key in args.courses:
+        dept, _, catalog_nbr = key.strip().partition(' ')
+        lines = export.single_course(args.dbfile, dept, catalog_nbr.strip())
+        if len(lines) == 0:
+            print(f'{key} is not in {args.dbfile}')
+            exit(1)
+        if args.folder is None:
+            print(''.join(lines), end='')
+        else:
+            with open(os.path.join(args.folder, 'catalog', f'{dept} {catalog_nbr.strip()}.jsonl'), 'w') as f:
+                f.writelines(lines)
+            print(f'{dept} {catalog_nbr.strip()}: {len(lines) - 1} sections written')
+
+# name => (description, arguments, command)
+COMMANDS = {
+    "csv2db": ('Pre-process CSV grade data into an intermediary database format.', csv2db_arguments, csv2db),
+    "db2jsonl": ('Prepare a SQLite database into Firestore-ready JSONL files', db2jsonl_arguments, db2jsonl),
+    "jsonl2firestore": ('Import formatted JSONL files into Google Firestore', jsonl2firestore_arguments, jsonl2firestore),
+    "pipeline": ('Run csv2db.py, db2jsonl.py and jsonl2firestore.py in one process, keeping only the outputs asked for', pipeline_arguments, pipeline),
+    "status": ('Summarize a records.db or an export and its last upload', status_arguments, status),
+    "course": ('Export single courses out of a records.db', course_arguments, course),
+}
+
+def script(name):
+    # entry point of the <name>.py scripts
+    description, arguments, command = COMMANDS[name]
+    parser = argparse.ArgumentParser(description=description)
+    arguments(parser)
+    command(parser.parse_args())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='cougargrades', description='Process the FOIA grade data for cougargrades.io')
+    subparsers = parser.add_subparsers(dest='command', metavar='command', required=True)
+    for name, (description, arguments, command) in COMMANDS.items():
+        arguments(subparsers.add_parser(name, help=description, description=description))
+    args = parser.parse_args(argv)
+    COMMANDS[args.command][2](args)
@@ -0,0 +1,568 @@
+import os
+import csv
+import time
+import itertools
+import collections
+
+from cougargrades import metrics
+from cougargrades.ingest import term_code, group_code, chunked, read_rows, split_file, parse_range, accumulate_prof, file_digest
+
+# The csv2db.py stage: grades CSV files => records.db
+
+def report_throughput(label, rows, seconds):
+    rate = rows / seconds if seconds > 0 else float('inf')
+    print(f'{label}: {rows} rows in {seconds:.2f}s ({rate:,.0f} rows/sec)')
+
+RECORDS_SCHEMA = '''(
+    ID int unsigned not null primary key unique,
+    TERM text,
+    DEPT text,
+    CATALOG_NBR text,
+    CLASS_SECTION smallint,
+    COURSE_DESCR text,
+    INSTR_LAST_NAME text,
+    INSTR_FIRST_NAME text,
+    A smallint,
+    B smallint,
+    C smallint,
+    D smallint,
+    F smallint,
+    Q smallint,
+    AVG_GPA real,
+    PROF_COUNT smallint,
+    PROF_AVG real,
+    PROF_MIN real,
+    PROF_MAX real,
+    TERM_CODE int,
+    GROUP_CODE text,
+    FIRESTORE_KEY text
+    )'''
+
+# query-oriented layout written by --single-pass: strings live once in the dimension tables,
+# TERM, GROUP_CODE and FIRESTORE_KEY are derived by the `records` view
+NORMALIZED_SCHEMA = [
+    '''CREATE TABLE courses (
+    COURSE_ID integer primary key,
+    DEPT text,
+    CATALOG_NBR text,
+    COURSE_DESCR text,
+    UNIQUE (DEPT, CATALOG_NBR)
+    )''',
+    '''CREATE TABLE instructors (
+    INSTRUCTOR_ID integer primary key,
+    INSTR_LAST_NAME text,
+    INSTR_FIRST_NAME text,
+    UNIQUE (INSTR_LAST_NAME, INSTR_FIRST_NAME)
+    )''',
+    '''CREATE TABLE sections (
+    ID integer primary key,
+    TERM_CODE int,
+    COURSE_ID int references courses (COURSE_ID),
+    CLASS_SECTION smallint,
+    INSTRUCTOR_ID int references instructors (INSTRUCTOR_ID),
+    A smallint,
+    B smallint,
+    C smallint,
+    D smallint,
+    F smallint,
+    Q smallint,
+    AVG_GPA real,
+    PROF_COUNT smallint,
+    PROF_AVG real,
+    PROF_MIN real,
+    PROF_MAX real
+    )''',
+    '''CREATE VIEW records AS SELECT
+    s.ID,
+    CASE s.TERM_CODE % 100 WHEN 1 THEN 'Spring' WHEN 2 THEN 'Summer' WHEN 3 THEN 'Fall' END || ' ' || (s.TERM_CODE / 100) AS TERM,
+    c.DEPT,
+    c.CATALOG_NBR,
+    s.CLASS_SECTION,
+    c.COURSE_DESCR,
+    i.INSTR_LAST_NAME,
+    i.INSTR_FIRST_NAME,
+    s.A,
+    s.B,
+    s.C,
+    s.D,
+    s.F,
+    s.Q,
+    s.AVG_GPA,
+    s.PROF_COUNT,
+    s.PROF_AVG,
+    s.PROF_MIN,
+    s.PROF_MAX,
+    s.TERM_CODE,
+    s.TERM_CODE || '-' || c.DEPT || c.CATALOG_NBR || '_' || replace(i.INSTR_LAST_NAME, ' ', '') || replace(i.INSTR_FIRST_NAME, ' ', '') AS GROUP_CODE,
+    s.TERM_CODE || '-' || c.DEPT || c.CATALOG_NBR || '_' || replace(i.INSTR_LAST_NAME, ' ', '') || replace(i.INSTR_FIRST_NAME, ' ', '') || '~' || s.CLASS_SECTION AS FIRESTORE_KEY
+    FROM sections s
+    JOIN courses c ON c.COURSE_ID = s.COURSE_ID
+    JOIN instructors i ON i.INSTRUCTOR_ID = s.INSTRUCTOR_ID''',
+]
+
+# lookups made by db2jsonl.py, course sections come back in ID order and instructor GPAs are covered
+NORMALIZED_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS sections_course ON sections (COURSE_ID)',
+    'CREATE INDEX IF NOT EXISTS sections_instructor ON sections (INSTRUCTOR_ID, PROF_AVG)',
+]
+FLAT_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS records_course ON records (DEPT, CATALOG_NBR)',
+    'CREATE INDEX IF NOT EXISTS records_instructor ON records (INSTR_LAST_NAME, INSTR_FIRST_NAME, PROF_AVG)',
+]
+
+def dimension_id(ids, key, pending, extra=()):
+    # surrogate key for a courses/instructors row, rows seen for the first time are queued in `pending`
+    if key not in ids:
+        ids[key] = len(ids) + 1
+        pending += [(ids[key],) + key + extra]
+    return ids[key]
+
+def parse_ahead(pool, jobs, csvfiles, normalize, chunk_size):
+    # => (path, batches, None) of every file, parsed by `pool` one range of `chunk_size` rows at a time
+    # ranges are handed out in order and at most two per worker wait for the writer, so memory does not grow with the input
+    def ranges():
+        for i, arg in enumerate(csvfiles):
+            try:
+                tasks = [(arg, start, end, normalize) for start, end in split_file(arg, chunk_size)]
+            except Exception as err:
+                yield i, (arg, [], str(err))
+                continue
+            if len(tasks) == 0:
+                # an empty file still gets its source_files row
+                yield i, (arg, [], None)
+            for task in tasks:
+                yield i, pool.apply_async(parse_range, (task,))
+    def results():
+        ahead = collections.deque()
+        for item in ranges():
+            ahead.append(item)
+            if len(ahead) > 2 * jobs:
+                yield wait(ahead.popleft())
+        while ahead:
+            yield wait(ahead.popleft())
+    def wait(item):
+        i, result = item
+        return (i,) + (result if isinstance(result, tuple) else result.get())
+    def batches(group):
+        # a range that failed to parse ends its file, like a CSV error part way through read_rows()
+        for i, arg, rows, error in group:
+            if error is not None:
+                raise Exception(error)
+            if rows:
+                yield rows
+    for (i, arg), group in itertools.groupby(results(), key=lambda result: result[:2]):
+        yield arg, batches(group), None
+
+def estimate_rows(csvfiles):
+    # total row estimate for tqdm, header rows not included
+    total = 0
+    for arg in csvfiles:
+        n = 0
+        try:
+            with open(arg, 'r') as f:
+                for line in f:
+                    n += 1
+        except Exception as err:
+            print(f'Failed to estimate rows.\nException: {err}')
+        total += (n - 1) # dont include header row
+    return total
+
+def create_tables(c, single_pass):
+    if single_pass:
+        # the final tables are created up front and filled directly
+        for statement in NORMALIZED_SCHEMA:
+            c.execute(statement)
+        # every ingested file by its absolute path, so later --append runs can skip it
+        # releases are often kept in folders of their own under the same file name
+        c.execute('''CREATE TABLE source_files (
+            NAME text not null primary key unique,
+            SHA256 text,
+            ROW_COUNT int,
+            FIRST_ID int,
+            LAST_ID int
+            )''')
+    else:
+        c.execute('''CREATE TABLE records (
+            TERM text,
+            DEPT text,
+            CATALOG_NBR text,
+            CLASS_SECTION smallint,
+            COURSE_DESCR text,
+            INSTR_LAST_NAME text,
+            INSTR_FIRST_NAME text,
+            A smallint,
+            B smallint,
+            C smallint,
+            D smallint,
+            F smallint,
+            Q smallint,
+            AVG_GPA real
+            )''')
+
+@metrics.timed('csv2db')
+def build(csvfiles, outfile, bulk=False, single_pass=False, append=False, chunk_size=10000, jobs=1,
+          journal_mode=None, synchronous=None, cache_size=-65536):
+    # ingests `csvfiles` into the SQLite database `outfile`, the options are the flags of csv2db.py
+    # => number of rows copied, 0 when an --append run found nothing new
+    if append:
+        single_pass = True
+    if single_pass or jobs > 1:
+        bulk = True
+
+    appending = append and os.path.exists(outfile)
+    if os.path.exists(outfile) and not appending:
+        os.remove(outfile)
+
+    # a new database is rebuilt from the CSV files if a run dies, so durability can be traded for speed,
+    # an appended one is the only copy of the archive and keeps SQLite's own rollback journal and fsyncs
+    if journal_mode is None:
+        journal_mode = 'DELETE' if appending else 'MEMORY'
+    if synchronous is None:
+        synchronous = 'FULL' if appending else 'OFF'
+
+    print(f'Appending to {outfile}...' if appending else f'Creating {outfile}...')
+    conn = metrics.connect(outfile)
+    c = conn.cursor()
+    if bulk:
+        # set before any transaction is opened, sqlite cannot switch journal modes inside one
+        c.execute(f'PRAGMA journal_mode={journal_mode}')
+        c.execute(f'PRAGMA synchronous={synchronous}')
+        c.execute(f'PRAGMA cache_size={int(cache_size)}')
+
+    # Create table
+    if appending:
+        c.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name IN ('source_files', 'sections')")
+        if c.fetchone()[0] < 2:
+            conn.close()
+            raise ValueError(f'{outfile} has no source_files manifest to append to, rebuild it with --single-pass first.')
+    else:
+        create_tables(c, single_pass)
+    conn.commit()
+
+    # instructor terms (TERM_CODE, COURSE_ID, INSTRUCTOR_ID) whose PROF_* columns have to be recomputed after ingesting
+    touched = set()
+    course_ids = {}
+    instructor_ids = {}
+    replaced = 0
+    digests = {}
+    id_offset = 0
+    if single_pass:
+        spinner = metrics.spinner('Comparing CSV files with the source_files manifest...')
+        spinner.start()
+        with metrics.span('compare manifest'):
+            c.execute('SELECT NAME, SHA256, FIRST_ID, LAST_ID FROM source_files')
+            manifest = { name: (digest, first, last) for name, digest, first, last in c.fetchall() }
+            known = set(digest for digest, first, last in manifest.values())
+            pending = []
+            skipped = []
+            for arg in csvfiles:
+                head, tail = os.path.split(arg)
+                try:
+                    digest = file_digest(arg)
+                except Exception as err:
+                    # left in place so the ingest step reports the failure
+                    digest = None
+                if digest is not None and digest in known:
+                    skipped += [tail]
+                    continue
+                known.add(digest)
+                digests[arg] = digest
+                if os.path.abspath(arg) in manifest:
+                    # the file changed since it was ingested, so its previous rows are replaced
+                    # the delete stays uncommitted until the new rows are in, a failure in between leaves the old ones
+                    if not conn.in_transaction:
+                        c.execute('BEGIN')
+                    digest, first, last = manifest[os.path.abspath(arg)]
+                    c.execute('SELECT DISTINCT TERM_CODE, COURSE_ID, INSTRUCTOR_ID FROM sections WHERE ID BETWEEN ? AND ?', (first, last))
+                    touched.update(c.fetchall())
+                    c.execute('DELETE FROM sections WHERE ID BETWEEN ? AND ?', (first, last))
+                    c.execute('DELETE FROM source_files WHERE NAME=?', (os.path.abspath(arg),))
+                    replaced += 1
+                pending += [arg]
+        spinner.succeed()
+        for tail in skipped:
+            print(f'Skipping {tail}, it was already ingested')
+        csvfiles = pending
+        if len(csvfiles) == 0:
+            # nothing was replaced either, the transaction is only opened for a replaced file
+            print('Nothing new to ingest')
+            conn.close()
+            return 0
+        c.execute('SELECT COALESCE(MAX(ID), 0) FROM sections')
+        id_offset = c.fetchone()[0]
+        c.execute('SELECT DEPT, CATALOG_NBR, COURSE_ID FROM courses ORDER BY COURSE_ID')
+        course_ids = { (dept, catalog_nbr): course_id for dept, catalog_nbr, course_id in c.fetchall() }
+        c.execute('SELECT INSTR_LAST_NAME, INSTR_FIRST_NAME, INSTRUCTOR_ID FROM instructors ORDER BY INSTRUCTOR_ID')
+        instructor_ids = { (last, first): instructor_id for last, first, instructor_id in c.fetchall() }
+
+    # computing total row estimate for tqdm
+    spinner = metrics.spinner('Estimating number of rows...')
+    spinner.start()
+    with metrics.span('estimate rows'):
+        ROW_ESTIMATE = estimate_rows(csvfiles)
+    spinner.succeed()
+    print(f'{ROW_ESTIMATE} rows estimated')
+
+
+    print('Copying rows from CSV...')
+    ingest_start = time.perf_counter()
+    ingested_rows = 0
+    prof_stats = {}
+    if bulk:
+        with metrics.progress(total=ROW_ESTIMATE, unit="rows") as t, metrics.span('copy rows') as copying:
+            # a single explicit transaction around every file, already open when an --append run deleted replaced rows
+            if not conn.in_transaction:
+                c.execute('BEGIN')
+            if jobs > 1:
+                # workers parse ranges of chunk_size rows, handed back in argument order so IDs stay stable
+                # the calling scripts run at import time, so workers are forked rather than spawned
+                import multiprocessing
+                ctx = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+                pool = ctx.Pool(jobs)
+                parsed = parse_ahead(pool, jobs, csvfiles, single_pass, chunk_size)
+            else:
+                # read lazily in this process, one chunk at a time
+                parsed = ((arg, chunked(read_rows(arg, single_pass), chunk_size), None) for arg in csvfiles)
+            # this process is the only one that owns the sqlite connection
+            for arg, batches, error in parsed:
+                head, tail = os.path.split(arg)
+                file_start = ingested_rows
+                try:
+                    # bound parameters instead of SQL text, so quotes in a course title are harmless
+                    for chunk in batches:
+                        if single_pass:
+                            batch = []
+                            new_courses = []
+                            new_instructors = []
+                            for row in chunk:
+                                course_id = dimension_id(course_ids, (row[1], row[2]), new_courses, (row[4],))
+                                instructor_id = dimension_id(instructor_ids, (row[5], row[6]), new_instructors)
+                                accumulate_prof(prof_stats, (row[18], course_id, instructor_id), row[13])
+                                batch += [(id_offset + ingested_rows + len(batch) + 1, row[18], course_id, row[3], instructor_id, *row[7:14])]
+                            c.executemany('INSERT INTO courses VALUES (?,?,?,?)', new_courses)
+                            c.executemany('INSERT INTO instructors VALUES (?,?,?)', new_instructors)
+                            c.executemany('INSERT INTO sections (ID, TERM_CODE, COURSE_ID, CLASS_SECTION, INSTRUCTOR_ID, A, B, C, D, F, Q, AVG_GPA) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)', batch)
+                        else:
+                            c.executemany('INSERT INTO records VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)', chunk)
+                        ingested_rows += len(chunk)
+                        copying.rows += len(chunk)
+                        t.update(len(chunk))
+                    if error is not None:
+                        raise Exception(error)
+                except Exception as err:
+                    t.write(f'Failed to read {tail} as a CSV file.\nException: {err}')
+                if single_pass and digests[arg] is not None:
+                    # rows of a partially read file are recorded too, so fixing the file replaces them on the next --append
+                    c.execute('INSERT INTO source_files VALUES (?,?,?,?,?)', (os.path.abspath(arg), digests[arg], ingested_rows - file_start, id_offset + file_start + 1, id_offset + ingested_rows))
+            if jobs > 1:
+                pool.close()
+                pool.join()
+            conn.commit()
+    else:
+        with metrics.progress(total=ROW_ESTIMATE, unit="rows") as t, metrics.span('copy rows') as copying:
+            # for every file provided
+            for arg in csvfiles:
+                head, tail = os.path.split(arg)
+                #tqdm.write(f'Reading {tail}...')
+                try:
+                    # read the file as a CSV file
+                    with open(arg, 'r') as csvfile:
+                        reader = csv.reader(csvfile)
+                        next(reader) # skips header row
+                        # for every row, insert into the database and update the progress bar
+                        for row in reader:
+                            # "Fall 2013",ACCT,4105,1,"PPA Colloquium 1",Newman,"Michael Ray",,,,,,,
+                            c.execute(f'INSERT INTO records VALUES {str(tuple(row))}') # tuples happen to be SQL syntax: `("hello", 2, false)`
+                            ingested_rows += 1
+                            copying.rows += 1
+                            t.update()
+                        # after every file, commit to the db before continuing to the next file
+                        conn.commit()
+                except Exception as err:
+                    t.write(f'Failed to read {tail} as a CSV file.\nException: {err}')
+    report_throughput('Copied', ingested_rows, time.perf_counter() - ingest_start)
+
+    if single_pass:
+        write_prof_stats(conn, touched, prof_stats, appending)
+    else:
+        conn.commit()
+        conn.close()
+        conn = copy_extra_columns(outfile, ROW_ESTIMATE)
+
+    # compute metadata about database
+    print('Computing catalog metadata...', end="")
+    write_catalog_meta(conn, appending, replaced, prof_stats)
+    print('Done')
+
+
+    if single_pass:
+        # nothing was dropped, so there are no free pages to reclaim
+        conn.close()
+    else:
+        c = conn.cursor()
+        with metrics.span('indexes'):
+            for statement in FLAT_INDEXES:
+                c.execute(statement)
+            conn.commit()
+
+        # vacuum sqlite file
+        spinner = metrics.spinner('Running sqlite VACUUM command...')
+        spinner.start()
+        with metrics.span('vacuum'):
+            c.execute('VACUUM')
+            conn.commit()
+        conn.close()
+        spinner.succeed()
+    return ingested_rows
+
+@metrics.timed('prof stats')
+def write_prof_stats(conn, touched, prof_stats, appending):
+    # single-pass: fills in the PROF_* columns of every instructor term that was ingested or replaced
+    c = conn.cursor()
+    # built after the bulk insert, an --append run finds them in place and seeks touched courses through them
+    with metrics.span('indexes'):
+        for statement in NORMALIZED_INDEXES:
+            c.execute(statement)
+    touched.update(prof_stats.keys())
+    spinner = metrics.spinner(f'Writing COUNT(), AVG(), MIN(), and MAX() for {len(touched)} instructor terms ...')
+    spinner.start()
+    c.execute('''CREATE TEMP TABLE prof_stats (
+        TERM_CODE int,
+        COURSE_ID int,
+        INSTRUCTOR_ID int,
+        PROF_COUNT smallint,
+        PROF_AVG real,
+        PROF_MIN real,
+        PROF_MAX real,
+        PRIMARY KEY (TERM_CODE, COURSE_ID, INSTRUCTOR_ID)
+        )''')
+    if appending:
+        # existing rows can share an instructor term with new ones, so those groups are aggregated by sqlite
+        c.execute('CREATE TEMP TABLE touched (TERM_CODE int, COURSE_ID int, INSTRUCTOR_ID int, PRIMARY KEY (TERM_CODE, COURSE_ID, INSTRUCTOR_ID))')
+        c.executemany('INSERT INTO temp.touched VALUES (?,?,?)', touched)
+        c.execute('''
+        INSERT INTO temp.prof_stats
+        SELECT s.TERM_CODE, s.COURSE_ID, s.INSTRUCTOR_ID, COUNT(*), AVG(s.AVG_GPA), MIN(s.AVG_GPA), MAX(s.AVG_GPA)
+        FROM temp.touched t CROSS JOIN sections s
+        ON s.COURSE_ID = t.COURSE_ID AND s.TERM_CODE = t.TERM_CODE AND s.INSTRUCTOR_ID = t.INSTRUCTOR_ID
+        GROUP BY s.TERM_CODE, s.COURSE_ID, s.INSTRUCTOR_ID
+        ''')
+        c.execute('DROP TABLE temp.touched')
+    else:
+        c.executemany('INSERT INTO temp.prof_stats VALUES (?,?,?,?,?,?,?)', (
+            key + (acc[0], acc[2] / acc[1] if acc[1] > 0 else None, acc[3], acc[4]) for key, acc in prof_stats.items()
+        ))
+    # rows are updated in place, ungraded sections keep a NULL PROF_AVG like the two-table path
+    # the IN clause lets sqlite seek sections by course instead of scanning them when appending
+    c.execute('''
+    UPDATE sections SET
+    PROF_COUNT = p.PROF_COUNT,
+    PROF_AVG = CASE WHEN sections.A IS NULL THEN NULL ELSE p.PROF_AVG END,
+    PROF_MIN = p.PROF_MIN,
+    PROF_MAX = p.PROF_MAX
+    FROM temp.prof_stats p
+    WHERE sections.TERM_CODE = p.TERM_CODE AND sections.COURSE_ID = p.COURSE_ID AND sections.INSTRUCTOR_ID = p.INSTRUCTOR_ID
+    AND sections.COURSE_ID IN (SELECT COURSE_ID FROM temp.prof_stats)
+    ''')
+    c.execute('DROP TABLE temp.prof_stats')
+    conn.commit()
+    spinner.succeed()
+
+@metrics.timed('records_extra copy')
+def copy_extra_columns(outfile, row_estimate):
+    # two-table path: copies `records` into `records_extra` with the PROF_* and derived columns, then swaps them
+    # => the connection the copy was made with
+    print('Computing extra columns...')
+    spinner = metrics.spinner('Computing COUNT(), AVG(), MIN(), and MAX() ...')
+    spinner.start()
+
+    conn = metrics.connect(outfile)
+    cread = conn.cursor()
+    cwrite = conn.cursor()
+
+    cwrite.execute(f'CREATE TABLE records_extra {RECORDS_SCHEMA}')
+    conn.commit()
+
+    # compute count()/avg(), sqlite runs the JOIN while stepping to the first row
+    with metrics.span('prof join'):
+        cread.execute('''
+        SELECT
+        records.TERM, records.DEPT, records.CATALOG_NBR, records.CLASS_SECTION, records.COURSE_DESCR, records.INSTR_LAST_NAME, records.INSTR_FIRST_NAME,
+        records.A, records.B, records.C, records.D, records.F, records.Q, records.AVG_GPA,
+        t2.PROF_COUNT, t2.PROF_AVG, t2.PROF_MIN, t2.PROF_MAX FROM records
+
+        LEFT JOIN(SELECT COUNT(records.AVG_GPA) AS PROF_COUNT, AVG(records.AVG_GPA) AS PROF_AVG, MIN(records.AVG_GPA) AS PROF_MIN, MAX(records.AVG_GPA) AS PROF_MAX, records.TERM, records.DEPT, records.CATALOG_NBR, records.INSTR_LAST_NAME, records.INSTR_FIRST_NAME FROM records GROUP BY TERM, DEPT, CATALOG_NBR, INSTR_LAST_NAME, INSTR_FIRST_NAME) t2
+
+        ON records.TERM = t2.TERM AND records.DEPT = t2.DEPT AND records.CATALOG_NBR = t2.CATALOG_NBR AND records.INSTR_LAST_NAME = t2.INSTR_LAST_NAME AND records.INSTR_FIRST_NAME = t2.INSTR_FIRST_NAME
+        ''')
+        row = cread.fetchone()
+    spinner.succeed()
+
+    print('Creating extra table from copied table...')
+    id_num = 1
+    with metrics.progress(total=row_estimate, unit="rows") as t, metrics.span('insert rows') as inserting:
+        while row != None:
+            tup = list(row)
+
+            # clean up whitespace
+            for i in range(len(tup)):
+                if type(tup[i]) is str:
+                    tup[i] = tup[i].strip()
+
+            # insert ID, TERM_CODE, and GROUP_CODE
+            tup = [id_num] + tup + [term_code(row[0]), group_code(row[0],row[1],row[2],row[5],row[6])] + [f'{group_code(row[0],row[1],row[2],row[5],row[6])}~{row[3]}']
+
+            # (822, 'Fall 2013', 'GEOL', 8398, 27, 'Doctoral Research', 'Han', 'De-Hua', '', '', '', '', '', '', '', 1, 0.0, 201303, '201303-GEOL8398_HanDe-Hua', FIRESTORE_KEY)
+            #  0    1            2       3     4   5                    6      7         8   9   10  11  12  13  14  15 16   17      18
+
+            # if grade not supplied, set grade-related cells to None
+            if tup[8] == '':
+                for i in range(8,15): # [8,15)
+                    tup[i] = None
+                tup[16] = None
+
+            cwrite.execute(f'INSERT INTO records_extra VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)', tuple(tup))
+            # if id_num % 2000 == 0:
+            #    tqdm.write(f'Processed row {id_num}')
+            id_num += 1
+            inserting.rows += 1
+            t.update()
+            row = cread.fetchone()
+
+    # close the sqlite3 connection
+    conn.commit()
+    print('Done')
+
+    print('Dropping original table and renaming extra table...', end="")
+    with metrics.span('swap tables'):
+        cwrite.execute('DROP TABLE records')
+        cwrite.execute('''
+        ALTER TABLE records_extra
+        RENAME TO records
+        ''')
+        conn.commit()
+    print('Done')
+    return conn
+
+@metrics.timed('catalog meta')
+def write_catalog_meta(conn, appending, replaced, prof_stats):
+    c = conn.cursor()
+    if appending:
+        # update in place, a replaced file may have removed the latest term so rescan in that case
+        if replaced > 0 or len(prof_stats) == 0:
+            c.execute('UPDATE catalog_meta SET latestTerm = (SELECT MAX(TERM_CODE) FROM sections)')
+        else:
+            c.execute('UPDATE catalog_meta SET latestTerm = MAX(latestTerm, ?)', [ max(key[0] for key in prof_stats) ])
+        conn.commit()
+    else:
+        c.execute('''CREATE TABLE catalog_meta (
+            latestTerm int
+            )''')
+        meta = {}
+
+        # compute latest term
+        c.execute('SELECT MAX(TERM_CODE) FROM records;')
+        meta["latestTerm"] = c.fetchall() # [(201901,)]
+        meta["latestTerm"] = meta["latestTerm"][0][0]
+        c.execute('INSERT INTO catalog_meta VALUES (?)', [ meta["latestTerm"] ])
+        conn.commit()
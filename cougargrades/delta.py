@@ -0,0 +1,106 @@
+import os
+import json
+import math
+import hashlib
+
+from cougargrades.plan import section_id
+
+# A manifest is a digest of everything an import wrote, saved after it succeeded:
+#   { "version": 1, "meta": sha1, "instructors": { 'Last, First': sha1 },
+#     "courses": { 'COSC 1430': { "header": sha1, "sections": { '201303-1': sha1 } } } }
+# Comparing the manifest of the last upload with one of the current export gives the change set.
+MANIFEST_VERSION = 1
+
+def digest(obj):
+    return hashlib.sha1(json.dumps(obj, sort_keys=True).encode()).hexdigest()
+
+def snapshot(courses, plan, meta):
+    #   courses: iterable of courses, each one an iterable of JSONL lines (header first, then sections)
+    #   plan: planned instructor documents, see cougargrades.plan
+    #   meta: contents of catalog_meta/meta.json
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "meta": digest(meta),
+        "instructors": { key: digest(doc) for key, doc in plan.items() },
+        "courses": {}
+    }
+    for lines in courses:
+        lines = iter(lines)
+        header = json.loads(next(lines))
+        sections = {}
+        for line in lines:
+            section = json.loads(line)
+            sections[section_id(section)] = digest(section)
+        # the course document is uploaded with its section count, so a new section changes the header too
+        header["sectionCount"] = len(sections)
+        manifest["courses"][f'{header["department"]} {header["catalogNumber"]}'] = { "header": digest(header), "sections": sections }
+    return manifest
+
+def load_manifest(path):
+    with open(path, 'r') as f:
+        manifest = json.loads(f.read())
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f'{path} has manifest version {manifest.get("version")}, expected {MANIFEST_VERSION}')
+    return manifest
+
+def save_manifest(path, manifest):
+    with open(f'{path}.tmp', 'w') as f:
+        f.write(json.dumps(manifest))
+    os.replace(f'{path}.tmp', path)
+
+def diff(previous, current):
+    # => change set that brings an upload of `previous` up to `current`:
+    #   { "courses": { 'COSC 1430': { "header": bool, "sections": [section IDs] } },
+    #     "instructors": [keys], "meta": bool, "removed": { "courses": n, "sections": n, "instructors": n } }
+    # Only courses with something to write are listed. Removed documents are counted, never deleted.
+    changes = { "courses": {}, "instructors": [], "meta": previous["meta"] != current["meta"], "removed": { "courses": 0, "sections": 0, "instructors": 0 } }
+    for name, course in current["courses"].items():
+        before = previous["courses"].get(name, { "header": None, "sections": {} })
+        sections = [sid for sid, h in course["sections"].items() if before["sections"].get(sid) != h]
+        header = before["header"] != course["header"]
+        if header or sections:
+            changes["courses"][name] = { "header": header, "sections": sections }
+        changes["removed"]["sections"] += len(before["sections"].keys() - course["sections"].keys())
+    changes["removed"]["courses"] = len(previous["courses"].keys() - current["courses"].keys())
+    for name in previous["courses"].keys() - current["courses"].keys():
+        changes["removed"]["sections"] += len(previous["courses"][name]["sections"])
+    changes["instructors"] = [key for key, h in current["instructors"].items() if previous["instructors"].get(key) != h]
+    changes["removed"]["instructors"] = len(previous["instructors"].keys() - current["instructors"].keys())
+    return changes
+
+def everything(current):
+    # the change set of a first upload, when there is no previous manifest
+    return {
+        "courses": { name: { "header": True, "sections": list(course["sections"]) } for name, course in current["courses"].items() },
+        "instructors": list(current["instructors"]),
+        "meta": True,
+        "removed": { "courses": 0, "sections": 0, "instructors": 0 }
+    }
+
+def estimate(changes, batch_size, workers, skip_existing=False, previous=None):
+    # => Firestore operations an import of `changes` costs, see jsonl2firestore.py for the writes it makes
+    sections = sum(len(course["sections"]) for course in changes["courses"].values())
+    headers = sum(1 for course in changes["courses"].values() if course["header"])
+    writes = sections + headers + len(changes["instructors"])
+    # the metadata document is read once and written if it is new or behind
+    reads = 1 if changes["meta"] else 0
+    listings = 0
+    if skip_existing:
+        # one listing per course, billed a read per section already there (at least one)
+        for name, course in changes["courses"].items():
+            known = len(previous["courses"].get(name, { "sections": {} })["sections"]) if previous is not None else len(course["sections"])
+            reads += max(1, known)
+            listings += 1
+    # every worker commits its own partial batch at the end of each phase
+    workers = max(1, min(workers, max(1, len(changes["courses"]))))
+    commits = math.ceil((sections + headers) / batch_size) + math.ceil(len(changes["instructors"]) / batch_size)
+    commits += min(workers - 1, len(changes["courses"])) + min(workers - 1, len(changes["instructors"]))
+    return {
+        "sections": sections,
+        "courses": len(changes["courses"]),
+        "headers": headers,
+        "instructors": len(changes["instructors"]),
+        "reads": reads,
+        "writes": writes + (1 if changes["meta"] else 0),
+        "rpcs": commits + listings + (2 if changes["meta"] else 0)
+    }
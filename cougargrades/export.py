@@ -0,0 +1,440 @@
+import os
+import os.path
+import json
+import sqlite3
+import hashlib
+import itertools
+
+from cougargrades import util
+from cougargrades import metrics
+from cougargrades import paths
+from cougargrades.stats import RunningStats
+from cougargrades.bundle import BundleWriter
+from cougargrades.ingest import section_id
+
+# The db2jsonl.py stage: records.db => course, instructor and catalog_meta documents
+
+# rows of one department, in course order, with the rows of every section next to each other and
+# sections ordered by their first row, so a course and a section are complete as soon as their key changes
+STREAM_COLUMNS = '''CATALOG_NBR, COURSE_DESCR, TERM_CODE, TERM, CLASS_SECTION, AVG_GPA, A, B, C, D, F, Q,
+    INSTR_FIRST_NAME, INSTR_LAST_NAME, PROF_MIN, PROF_MAX, PROF_AVG, PROF_COUNT,
+    MIN(ID) OVER (PARTITION BY CATALOG_NBR, TERM_CODE, CLASS_SECTION) AS FIRST_ID'''
+STREAM_QUERY = f'SELECT {STREAM_COLUMNS} FROM records WHERE DEPT=? ORDER BY CATALOG_NBR, FIRST_ID, ID'
+# the same rows for a single course, seeked through the course index
+COURSE_QUERY = f'SELECT {STREAM_COLUMNS} FROM records WHERE DEPT=? AND CATALOG_NBR=? ORDER BY FIRST_ID, ID'
+
+# rows fetched from SQLite at a time, this (not the size of a course) bounds the rows held in memory
+STREAM_BATCH = 1000
+
+# bump when the exported documents change shape, so every fingerprint is invalidated
+FINGERPRINT_VERSION = '3'
+
+# what the documents are made of, hashed in ID order: IDs themselves shift whenever a row is added or
+# removed anywhere before them, so they would mark every later course and instructor as changed
+COURSE_FINGERPRINT = '''SELECT DEPT, CATALOG_NBR, COURSE_DESCR, TERM_CODE, TERM, CLASS_SECTION, AVG_GPA, A, B, C, D, F, Q,
+    INSTR_FIRST_NAME, INSTR_LAST_NAME, PROF_MIN, PROF_MAX, PROF_AVG, PROF_COUNT FROM records ORDER BY DEPT, CATALOG_NBR, ID'''
+INSTRUCTOR_FINGERPRINT = 'SELECT INSTR_LAST_NAME, INSTR_FIRST_NAME, PROF_AVG FROM records ORDER BY INSTR_LAST_NAME, INSTR_FIRST_NAME, ID'
+
+def connect(dbfile):
+    # read-only connection for streaming rows, one per process or thread
+    conn = metrics.connect(f'file:{dbfile}?mode=ro', uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def stream_rows(cursor):
+    while True:
+        batch = cursor.fetchmany(STREAM_BATCH)
+        if not batch:
+            return
+        yield from batch
+
+def section_document(rows):
+    # sections with multiple instructors have one row per instructor, the first row supplies the section data
+    sec = next(rows)
+    # write JSON in the new schema
+    data = {
+        "id": section_id(sec["TERM_CODE"], sec["CLASS_SECTION"]),
+        "term": sec["TERM_CODE"],
+        "termString": sec["TERM"],
+        "sectionNumber": sec["CLASS_SECTION"],
+        "semesterGPA": sec["AVG_GPA"],
+        "A": sec["A"],
+        "B": sec["B"],
+        "C": sec["C"],
+        "D": sec["D"],
+        "F": sec["F"],
+        "Q": sec["Q"],
+        "instructorNames": []
+    }
+    seen = set()
+    for sec in itertools.chain([sec], rows):
+        # de-dupe instructors that are listed twice for the same section number, the first row wins
+        name = (sec["INSTR_FIRST_NAME"], sec["INSTR_LAST_NAME"])
+        if name in seen:
+            continue
+        seen.add(name)
+        # append a new object to "instructors" property
+        data["instructorNames"] += [{
+            "firstName": sec["INSTR_FIRST_NAME"],
+            "lastName": sec["INSTR_LAST_NAME"],
+            "termGPAmin": sec["PROF_MIN"],
+            "termGPAmax": sec["PROF_MAX"],
+            "termGPA": sec["PROF_AVG"],
+            "termSectionsTaught": sec["PROF_COUNT"]
+        }]
+    return data
+
+def course_lines(dept, catalog_nbr, rows, names, counts, course_stats):
+    # yields the JSONL lines of one course while its rows stream by
+    rows = iter(rows)
+    first = next(rows)
+    # the first line is a header
+    meta = {
+        "department": dept,
+        "catalogNumber": catalog_nbr,
+        "description": first["COURSE_DESCR"],
+        "GPA": course_stats.get((dept, catalog_nbr), {
+            "minimum": None,
+            "maximum": None,
+            "average": None,
+            "median": None,
+            "range": None,
+            "standardDeviation": None,
+        }),
+        "sectionCount": 0
+    }
+    yield f'{json.dumps(meta)}\n'
+    # one pass over the course, sections are written in order of their first row
+    for key, section in itertools.groupby(itertools.chain([first], rows), key=lambda sec: (sec["TERM_CODE"], sec["CLASS_SECTION"])):
+        data = section_document(counted(section, counts))
+        for item in data["instructorNames"]:
+            names[(item["firstName"], item["lastName"])] = None
+        counts["written"] += 1
+        yield f'''{json.dumps(data)}\n'''
+
+def counted(rows, counts):
+    for row in rows:
+        counts["rows"] += 1
+        yield row
+
+def department_courses(conn, dept, catalog_numbers, course_stats, names, counts):
+    # streams every course of one department out of one ordered query
+    # => (catalog number, lines) in course order, the lines of a course are read before the next course is
+    wanted = set(catalog_numbers)
+    c = conn.cursor()
+    c.execute(STREAM_QUERY, (dept,))
+    for catalog_nbr, rows in itertools.groupby(stream_rows(c), key=lambda sec: sec["CATALOG_NBR"]):
+        # unchanged courses of an --incremental export are skipped over
+        if catalog_nbr not in wanted:
+            continue
+        yield catalog_nbr, course_lines(dept, catalog_nbr, rows, names, counts, course_stats)
+
+# what every worker process exports from, see init_worker()
+worker = {}
+
+def init_worker(dbfile, course_stats):
+    worker["dbfile"] = dbfile
+    worker["course_stats"] = course_stats
+
+def export_department(task):
+    # process pool entry point: (dept, [catalog numbers]) with its own read-only connection
+    # => ([(firstName, lastName), ...] in order of appearance, rows read, sections written, [(catalog number, [lines]), ...])
+    dept, catalog_numbers = task
+    conn = connect(worker["dbfile"])
+    names = {}
+    counts = { "rows": 0, "written": 0 }
+    courses = [(catalog_nbr, list(lines)) for catalog_nbr, lines in department_courses(conn, dept, catalog_numbers, worker["course_stats"], names, counts)]
+    conn.close()
+    return list(names), counts["rows"], counts["written"], courses
+
+def instructor_document(first, last):
+    return {
+        "firstName": first,
+        "lastName": last,
+        "fullName": f'{first} {last}',
+        "keywords": util.generateKeywords(first, last),
+        "GPA.minimum": None,
+        "GPA.maximum": None,
+        "GPA.average": None,
+        "GPA.median": None,
+        "GPA.range": None,
+        "GPA.standardDeviation": None
+    }
+
+def grouped_fingerprints(conn, query, width):
+    # one ordered pass: the first `width` columns are the key and the remaining columns of every row are hashed
+    # => { key: (sha1, rows) }
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(query)
+    result = {}
+    for key, rows in itertools.groupby(cursor, key=lambda r: r[:width]):
+        h = hashlib.sha1(FINGERPRINT_VERSION.encode())
+        n = 0
+        for r in rows:
+            h.update(json.dumps(r[width:]).encode())
+            n += 1
+        result[key] = (h.hexdigest(), n)
+    return result
+
+def grouped_stats(conn, query, params=()):
+    # one ordered pass: rows are (key..., PROF_AVG) and consecutive rows with the same key form a group
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(query, params)
+    stats = {}
+    for key, rows in itertools.groupby(cursor, key=lambda r: r[:-1]):
+        acc = RunningStats()
+        for r in rows:
+            acc.add(r[-1])
+        stats[key] = acc.to_dict()
+    return stats
+
+def single_course(dbfile, dept, catalog_nbr):
+    # the JSONL lines of one course, without the passes over the whole database Export makes
+    # => [lines], empty when the course is not in `dbfile`
+    conn = connect(dbfile)
+    course_stats = grouped_stats(conn, 'SELECT DEPT, CATALOG_NBR, PROF_AVG FROM records WHERE PROF_AVG IS NOT NULL AND DEPT=? AND CATALOG_NBR=? ORDER BY DEPT, CATALOG_NBR', (dept, catalog_nbr))
+    c = conn.cursor()
+    c.execute(COURSE_QUERY, (dept, catalog_nbr))
+    rows = stream_rows(c)
+    first = next(rows, None)
+    lines = []
+    if first is not None:
+        lines = list(course_lines(dept, catalog_nbr, itertools.chain([first], rows), {}, { "rows": 0, "written": 0 }, course_stats))
+    conn.close()
+    return lines
+
+class Export:
+    # a records.db opened for exporting, its course and instructor documents are generated on demand
+    def __init__(self, dbfile):
+        self.dbfile = dbfile
+        self.conn = metrics.connect(dbfile)
+        self.conn.row_factory = sqlite3.Row
+        c = self.conn.cursor()
+        c.execute('SELECT DISTINCT DEPT, CATALOG_NBR FROM records ORDER BY DEPT, CATALOG_NBR;')
+        # plain (DEPT, CATALOG_NBR) tuples, they are sent to worker processes
+        self.unique_courses = [tuple(row) for row in c]
+        c.execute('SELECT COUNT(*) FROM records;')
+        self.total_rows = c.fetchone()[0]
+        c.execute('SELECT * FROM catalog_meta;')
+        self.catalog_meta = dict(c.fetchone()) # {'latestTerm': 201901}
+        self.course_stats = None
+        self.instructor_stats = None
+        # instructors seen, rows read and sections written by courses()
+        self.names = {}
+        self.counts = { "rows": 0, "written": 0 }
+
+    @metrics.timed('course stats')
+    def compute_course_stats(self):
+        self.course_stats = grouped_stats(self.conn, 'SELECT DEPT, CATALOG_NBR, PROF_AVG FROM records WHERE PROF_AVG IS NOT NULL ORDER BY DEPT, CATALOG_NBR')
+
+    @metrics.timed('instructor stats')
+    def compute_instructor_stats(self):
+        self.instructor_stats = grouped_stats(self.conn, 'SELECT INSTR_LAST_NAME, INSTR_FIRST_NAME, PROF_AVG FROM records WHERE PROF_AVG IS NOT NULL ORDER BY INSTR_LAST_NAME, INSTR_FIRST_NAME')
+
+    def departments(self, courses=None):
+        # departments are the unit of work, each one is read by a single query (and worker)
+        # => [(dept, [catalog numbers]), ...] of every course, or of the (DEPT, CATALOG_NBR) pairs in `courses`
+        courses = self.unique_courses if courses is None else courses
+        return [ (dept, [catalog_nbr for d, catalog_nbr in group]) for dept, group in itertools.groupby(courses, key=lambda course: course[0]) ]
+
+    def courses(self, departments=None, jobs=1):
+        # yields (dept, catalog number, lines) in department and course order
+        # with jobs > 1 departments are exported by worker processes and lines are lists,
+        # otherwise lines are generators streaming out of SQLite that have to be read before the next course
+        if self.course_stats is None:
+            self.compute_course_stats()
+        departments = self.departments() if departments is None else departments
+        if jobs > 1:
+            # the calling scripts run at import time, so workers are forked rather than spawned
+            import multiprocessing
+            ctx = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+            pool = ctx.Pool(jobs, initializer=init_worker, initargs=(self.dbfile, self.course_stats))
+            try:
+                # imap() yields in department order whatever finishes first, so the output is deterministic
+                for (dept, catalog_numbers), (names, rows, written, courses) in zip(departments, pool.imap(export_department, departments)):
+                    for name in names:
+                        self.names[name] = None
+                    self.counts["rows"] += rows
+                    self.counts["written"] += written
+                    for catalog_nbr, lines in courses:
+                        yield dept, catalog_nbr, lines
+                pool.close()
+                pool.join()
+            finally:
+                pool.terminate()
+        else:
+            conn = connect(self.dbfile)
+            for dept, catalog_numbers in departments:
+                for catalog_nbr, lines in department_courses(conn, dept, catalog_numbers, self.course_stats, self.names, self.counts):
+                    yield dept, catalog_nbr, lines
+            conn.close()
+
+    def course(self, dept, catalog_nbr, conn):
+        # the JSONL lines of one course, streamed through the course index over `conn` (see connect())
+        if self.course_stats is None:
+            self.compute_course_stats()
+        c = conn.cursor()
+        c.execute(COURSE_QUERY, (dept, catalog_nbr))
+        yield from course_lines(dept, catalog_nbr, stream_rows(c), {}, { "rows": 0, "written": 0 }, self.course_stats)
+
+    def instructor(self, first, last):
+        # the complete instructor document, GPA statistics are computed over every section taught
+        if self.instructor_stats is None:
+            self.compute_instructor_stats()
+        doc = instructor_document(first, last)
+        stats = self.instructor_stats.get((last, first))
+        if stats is not None:
+            for key, value in stats.items():
+                doc[f'GPA.{key}'] = value
+        return doc
+
+    def close(self):
+        self.conn.close()
+
+def make_folders(folder, bundle):
+    # the folder first, then its subfolders
+    for path in paths.missing_folders(folder, bundle):
+        os.mkdir(path)
+
+@metrics.timed('db2jsonl')
+def export(dbfile, folder, jobs=1, incremental=False, bundle=False):
+    # writes the documents of `dbfile` as JSONL under `folder`, the options are the flags of db2jsonl.py
+    make_folders(folder, bundle)
+
+    print('''
+TODO
+  ◯ Write `catalog` collection
+  ◯ Write `instructors` collection
+  ◯ Compute statistics for `instructors` collection
+  ◯ Compute statistics for `catalog` collection
+''')
+
+    with metrics.span('open'):
+        records = Export(dbfile)
+    unique_courses = records.unique_courses
+    total_rows = records.total_rows
+
+    print(f'{len(unique_courses)} distinct courses and {total_rows} total rows in {dbfile}')
+
+    spinner = metrics.spinner('Writing collection `catalog_meta` ...')
+    spinner.start()
+    with open(os.path.join(folder, 'catalog_meta', 'meta.json'), 'w') as f:
+        f.write(f'{json.dumps(records.catalog_meta)}')
+    spinner.succeed()
+
+    spinner = metrics.spinner(f'📊 Computing statistics for {len(unique_courses)} courses ...')
+    spinner.start()
+    records.compute_course_stats()
+    spinner.succeed()
+
+    if not bundle:
+        # a full export records its fingerprints too, so the next --incremental run compares against what is on disk
+        spinner = metrics.spinner('Fingerprinting courses and instructors ...')
+        spinner.start()
+        with metrics.span('fingerprints'):
+            course_fps = grouped_fingerprints(records.conn, COURSE_FINGERPRINT, 2)
+            instructor_fps = grouped_fingerprints(records.conn, INSTRUCTOR_FINGERPRINT, 2)
+        fingerprints = {
+            "courses": { f'{dept} {catalog_nbr}': fp for (dept, catalog_nbr), (fp, n) in course_fps.items() },
+            "instructors": { f'{last}, {first}': fp for (last, first), (fp, n) in instructor_fps.items() }
+        }
+        spinner.succeed()
+
+    if incremental:
+        spinner = metrics.spinner('Comparing with the fingerprints of the last export ...')
+        spinner.start()
+        previous = { "courses": {}, "instructors": {} }
+        if os.path.isfile(os.path.join(folder, 'fingerprints.json')):
+            with open(os.path.join(folder, 'fingerprints.json'), 'r') as f:
+                previous = json.loads(f.read())
+        # an entity is re-exported when its rows changed or its file went missing
+        unique_courses = [
+            (dept, catalog_nbr) for (dept, catalog_nbr) in unique_courses
+            if previous["courses"].get(f'{dept} {catalog_nbr}') != fingerprints["courses"][f'{dept} {catalog_nbr}']
+            or not os.path.isfile(os.path.join(folder, 'catalog', f'{dept} {catalog_nbr}.jsonl'))
+        ]
+        changed_instructors = [
+            (last, first) for (last, first) in instructor_fps
+            if previous["instructors"].get(f'{last}, {first}') != fingerprints["instructors"][f'{last}, {first}']
+            or not os.path.isfile(os.path.join(folder, 'instructors', f'{last}, {first}.json'))
+        ]
+        total_rows = sum(course_fps[course][1] for course in unique_courses)
+        spinner.succeed(text=f'{len(unique_courses)} of {len(course_fps)} courses and {len(changed_instructors)} of {len(instructor_fps)} instructors changed')
+
+    print('Writing collection `catalog/` ...')
+
+    departments = records.departments(unique_courses)
+    catalog_bundle = BundleWriter(os.path.join(folder, 'catalog.jsonl')) if bundle else None
+    with metrics.progress(total=total_rows, unit="rows") as t, metrics.span('catalog') as writing:
+        i = 0 # used in the progress bar description to indicate what department is being processed
+        current = None
+        for dept, catalog_nbr, lines in records.courses(departments, jobs):
+            if dept != current:
+                i += 1
+                current = dept
+                t.set_description(f'[{i}/{len(departments)}] {dept}')
+            # departments arrive in order, so the bundle is in the same course order as the folder listing
+            if bundle:
+                catalog_bundle.add(f'{dept} {catalog_nbr}', lines)
+            else:
+                # write the file
+                with open(os.path.join(folder, 'catalog', f'{dept} {catalog_nbr}.jsonl'), 'w') as f:
+                    f.writelines(lines)
+            metrics.count('courses')
+            # rows that were folded into another section count towards the progress bar too
+            t.update(records.counts["rows"] - t.n)
+        writing.rows = records.counts["rows"]
+        metrics.count('sections', records.counts["written"])
+    if bundle:
+        catalog_bundle.close()
+    finished_rows = records.counts["written"]
+
+    if finished_rows > 0:
+        print(f'To account for sections with multiple professors, {total_rows} records were de-duplicated into {finished_rows} ({round(((1 - (total_rows/finished_rows)) * 100), 1)}%).')
+
+    # every instructor document is written once its statistics are known
+    # instructors follow their own fingerprints in an --incremental export, an unchanged course can still have a changed instructor
+    instructors = {}
+    for first, last in (records.names if not incremental else []):
+        instructors[f'{last}, {first}.json'] = (first, last)
+    if incremental:
+        for last, first in changed_instructors:
+            instructors[f'{last}, {first}.json'] = (first, last)
+
+    print(f'📊 Computing statistics for {len(instructors)} instructors.')
+
+    records.compute_instructor_stats()
+    instructor_bundle = BundleWriter(os.path.join(folder, 'instructors.jsonl')) if bundle else None
+    with metrics.progress(iterable=sorted(instructors), total=len(instructors), unit="files") as t, metrics.span('instructors') as writing:
+        for item in t:
+            data = records.instructor(*instructors[item])
+            if bundle:
+                # keyed like the file it replaces, without the extension
+                instructor_bundle.add(item[:-len('.json')], [f'{json.dumps(data)}\n'])
+            else:
+                with open(os.path.join(folder, 'instructors', item), 'w') as f:
+                    f.write(f'''{json.dumps(data)}\n''')
+            writing.rows += 1
+    if bundle:
+        instructor_bundle.close()
+        print(f'{catalog_bundle.rows} lines in {len(catalog_bundle.entries)} courses and {instructor_bundle.rows} instructors bundled')
+
+    if incremental:
+        # remove the files of courses and instructors that disappeared, then remember what was exported
+        removed = 0
+        for key in previous["courses"].keys() - fingerprints["courses"].keys():
+            if os.path.isfile(os.path.join(folder, 'catalog', f'{key}.jsonl')):
+                os.remove(os.path.join(folder, 'catalog', f'{key}.jsonl'))
+                removed += 1
+        for key in previous["instructors"].keys() - fingerprints["instructors"].keys():
+            if os.path.isfile(os.path.join(folder, 'instructors', f'{key}.json')):
+                os.remove(os.path.join(folder, 'instructors', f'{key}.json'))
+                removed += 1
+        print(f'{removed} files of removed courses and instructors were deleted')
+    if not bundle:
+        with open(os.path.join(folder, 'fingerprints.json.tmp'), 'w') as f:
+            f.write(json.dumps(fingerprints))
+        os.replace(os.path.join(folder, 'fingerprints.json.tmp'), os.path.join(folder, 'fingerprints.json'))
+    records.close()
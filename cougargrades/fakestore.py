@@ -0,0 +1,233 @@
+import copy
+import time
+import random
+import string
+import threading
+
+from google.api_core import exceptions
+from google.cloud.firestore_v1.transforms import ArrayUnion, ArrayRemove, Increment, DELETE_FIELD
+
+# An in-process stand-in for the part of the Firestore client that jsonl2firestore.py uses, for
+# measuring the importer without a billed project. Every call that would be a network round trip
+# is counted (and delayed by `latency` seconds), together with the document reads and writes
+# Firestore would bill for it.
+
+class FakeClient:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        # { 'catalog/COSC 1430': {...}, 'catalog/COSC 1430/sections/201303-1': {...}, ... }
+        self.store = {}
+        # { collection path: {document paths} }, so listings and queries do not scan the whole store
+        self.children = {}
+        self.rpcs = 0
+        self.reads = 0
+        self.writes = 0
+        # re-entrant, so a batch can hold it while applying its writes one by one
+        self.lock = threading.RLock()
+
+    def collection(self, name):
+        return FakeCollectionReference(self, name)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def _rpc(self, reads=0, writes=0):
+        with self.lock:
+            self.rpcs += 1
+            self.reads += reads
+            self.writes += writes
+        # sleeping releases the GIL, so concurrent callers overlap their latency like real RPCs do
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _apply(self, path, data, merge=False, update=False):
+        with self.lock:
+            if update and path not in self.store:
+                raise exceptions.NotFound(f'No document to update: {path}')
+            doc = self.store.get(path, {}) if (merge or update) else {}
+            for key, value in data.items():
+                # update() takes dotted field paths, set(merge=True) merges nested maps
+                fields = key.split('.') if update else [key]
+                apply_field(doc, fields, value, merge)
+            self.store[path] = doc
+            self.children.setdefault(path.rsplit('/', 1)[0], set()).add(path)
+
+    def _remove(self, path):
+        with self.lock:
+            self.store.pop(path, None)
+            self.children.get(path.rsplit('/', 1)[0], set()).discard(path)
+
+    def _documents(self, collection):
+        # => [(path, document), ...] of one collection, in path order
+        with self.lock:
+            return [(path, self.store[path]) for path in sorted(self.children.get(collection, ()))]
+
+    def stats(self):
+        return { "rpcs": self.rpcs, "reads": self.reads, "writes": self.writes, "documents": len(self.store) }
+
+def apply_field(doc, fields, value, merge):
+    for field in fields[:-1]:
+        if not isinstance(doc.get(field), dict):
+            doc[field] = {}
+        doc = doc[field]
+    field = fields[-1]
+    if value is DELETE_FIELD:
+        doc.pop(field, None)
+    elif isinstance(value, ArrayUnion):
+        current = list(doc.get(field) or [])
+        doc[field] = current + [v for v in value.values if v not in current]
+    elif isinstance(value, ArrayRemove):
+        doc[field] = [v for v in doc.get(field) or [] if v not in value.values]
+    elif isinstance(value, Increment):
+        doc[field] = (doc.get(field) or 0) + value.value
+    elif merge and isinstance(value, dict):
+        if not isinstance(doc.get(field), dict):
+            doc[field] = {}
+        for key, inner in value.items():
+            apply_field(doc[field], [key], inner, merge)
+    else:
+        doc[field] = copy.deepcopy(value)
+
+def auto_id():
+    # same shape as the IDs Firestore generates
+    return ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(20))
+
+class FakeDocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.id = path.split('/')[-1]
+
+    def __eq__(self, other):
+        return isinstance(other, FakeDocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def __deepcopy__(self, memo):
+        # references are immutable, copying a document must not copy the client behind them
+        return self
+
+    def __repr__(self):
+        return f'FakeDocumentReference({self.path!r})'
+
+    @property
+    def parent(self):
+        return FakeCollectionReference(self._client, self.path.rsplit('/', 1)[0])
+
+    def collection(self, name):
+        return FakeCollectionReference(self._client, f'{self.path}/{name}')
+
+    def get(self):
+        self._client._rpc(reads=1)
+        return FakeDocumentSnapshot(self, self._client.store.get(self.path))
+
+    def set(self, data, merge=False):
+        self._client._rpc(writes=1)
+        self._client._apply(self.path, data, merge=merge)
+
+    def update(self, data):
+        self._client._rpc(writes=1)
+        self._client._apply(self.path, data, update=True)
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = copy.deepcopy(data)
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+class FakeCollectionReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.id = path.split('/')[-1]
+
+    def document(self, document_id=None):
+        return FakeDocumentReference(self._client, f'{self.path}/{document_id if document_id is not None else auto_id()}')
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return time.time(), ref
+
+    def where(self, field, op, value):
+        return FakeQuery(self, []).where(field, op, value)
+
+    def stream(self):
+        return FakeQuery(self, []).stream()
+
+    def list_documents(self):
+        # one listing, billed as a read per document returned (at least one)
+        paths = [path for path, doc in self._client._documents(self.path)]
+        self._client._rpc(reads=max(1, len(paths)))
+        return [FakeDocumentReference(self._client, path) for path in paths]
+
+OPERATORS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a is not None and a < b,
+    '<=': lambda a, b: a is not None and a <= b,
+    '>': lambda a, b: a is not None and a > b,
+    '>=': lambda a, b: a is not None and a >= b,
+    'in': lambda a, b: a in b,
+    'array_contains': lambda a, b: isinstance(a, list) and b in a,
+}
+
+class FakeQuery:
+    def __init__(self, collection, filters):
+        self._collection = collection
+        self._filters = filters
+
+    def where(self, field, op, value):
+        if op not in OPERATORS:
+            raise ValueError(f'operator {op} is not supported by the fake')
+        return FakeQuery(self._collection, self._filters + [(field, OPERATORS[op], value)])
+
+    def stream(self):
+        client = self._collection._client
+        matches = []
+        for path, doc in client._documents(self._collection.path):
+            if all(test(doc.get(field), value) for field, test, value in self._filters):
+                matches += [FakeDocumentSnapshot(FakeDocumentReference(client, path), doc)]
+        # a query is billed at least one read even when nothing matches
+        client._rpc(reads=max(1, len(matches)))
+        return iter(matches)
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes += [(reference.path, data, { "merge": merge })]
+
+    def update(self, reference, data):
+        self._writes += [(reference.path, data, { "update": True })]
+
+    def commit(self):
+        if len(self._writes) > 500:
+            raise exceptions.InvalidArgument('maximum 500 writes allowed per request')
+        self._client._rpc(writes=len(self._writes))
+        # all or nothing, like a real batch: the documents it touches are restored if a write fails
+        store = self._client.store
+        with self._client.lock:
+            before = {}
+            try:
+                for path, data, kwargs in self._writes:
+                    if path not in before:
+                        before[path] = copy.deepcopy(store.get(path))
+                    self._client._apply(path, data, **kwargs)
+            except Exception:
+                for path, doc in before.items():
+                    if doc is None:
+                        self._client._remove(path)
+                    else:
+                        store[path] = doc
+                raise
+        results = self._writes
+        self._writes = []
+        return results
@@ -0,0 +1,120 @@
+import io
+import csv
+import hashlib
+import itertools
+
+def term_code(term):
+    return int(f'{term[term.find(" ")+1:]}{season_code(term[:term.find(" ")])}')
+
+def season_code(season):
+    if season == "Spring":
+        return "01"
+    if season == "Summer":
+        return "02"
+    if season == "Fall":
+        return "03"
+
+def group_code(term, subject, catalog_number, last, first):
+    return f'{term_code(term)}-{subject}{catalog_number}_{last.replace(" ","")}{first.replace(" ","")}'
+
+def section_id(term_code, class_section):
+    # document ID of a section within its course's `sections` subcollection, e.g. 201303-1 (see schema.md)
+    return f'{term_code}-{class_section}'
+
+def chunked(reader, size):
+    # yields lists of up to `size` rows without materializing the whole file
+    while True:
+        chunk = list(itertools.islice(reader, size))
+        if not chunk:
+            return
+        yield chunk
+
+def normalize_row(row):
+    # "Fall 2013",ACCT,4105,1,"PPA Colloquium 1",Newman,"Michael Ray",,,,,,,
+    tup = [cell.strip() for cell in row]
+    # if grade not supplied, set grade-related cells to None
+    if tup[7] == '':
+        for i in range(7,14): # [7,14)
+            tup[i] = None
+    else:
+        for i in range(7,14):
+            if tup[i] == '':
+                tup[i] = None
+    return tup
+
+def derive_row(tup):
+    # ['Fall 2013', 'GEOL', '8398', '27', 'Doctoral Research', 'Han', 'De-Hua', None, ..., None, None, None, None, None, 201303, '201303-GEOL8398_HanDe-Hua', FIRESTORE_KEY]
+    #  0            1       2       3     4                    5      6         7         13    14    15    16    17    18      19                           20
+    # the ID column is prepended by whoever assigns IDs
+    gc = group_code(tup[0],tup[1],tup[2],tup[5],tup[6])
+    return tup + [None, None, None, None] + [term_code(tup[0]), gc, f'{gc}~{tup[3]}']
+
+def read_rows(path, normalize=False):
+    # yields every data row of a grades CSV, normalized and derived when requested
+    with open(path, 'r', newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader) # skips header row
+        for row in reader:
+            yield derive_row(normalize_row(row)) if normalize else row
+
+def split_file(path, size):
+    # => [(start, end), ...] byte ranges of `path` holding up to `size` CSV rows each, the header row excluded
+    # a newline ends a row unless it is inside a quoted cell, which an odd number of quotes before it gives away
+    ranges = []
+    with open(path, 'rb') as f:
+        quotes = 0
+        offset = 0
+        start = None
+        rows = 0
+        for line in f:
+            quotes += line.count(b'"')
+            offset += len(line)
+            if quotes % 2 == 1:
+                continue
+            if start is None:
+                # end of the header row
+                start = offset
+                continue
+            rows += 1
+            if rows == size:
+                ranges += [(start, offset)]
+                start = offset
+                rows = 0
+        if start is not None and offset > start:
+            # the rows left over, or an unterminated quote that parse_range() reports like read_rows() would
+            ranges += [(start, offset)]
+    return ranges
+
+def parse_range(task):
+    # process pool entry point: (path, start, end, normalize) => (path, rows, error), one range of split_file()
+    path, start, end, normalize = task
+    try:
+        with open(path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+        # decoded like read_rows() opens the file
+        reader = csv.reader(io.TextIOWrapper(io.BytesIO(data), newline=''))
+        return path, [derive_row(normalize_row(row)) if normalize else row for row in reader], None
+    except Exception as err:
+        return path, [], str(err)
+
+def accumulate_prof(stats, key, gpa):
+    # per instructor term: [sections, graded, sum, min, max]
+    acc = stats.get(key)
+    if acc is None:
+        acc = stats[key] = [0, 0, 0.0, None, None]
+    acc[0] += 1
+    if gpa is not None:
+        gpa = float(gpa)
+        acc[1] += 1
+        acc[2] += gpa
+        acc[3] = gpa if acc[3] is None or gpa < acc[3] else acc[3]
+        acc[4] = gpa if acc[4] is None or gpa > acc[4] else acc[4]
+
+def file_digest(path):
+    # sha256 of the file contents, used to recognize files that were already ingested
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
@@ -0,0 +1,76 @@
+import time
+import sqlite3
+import threading
+
+JOURNAL_SCHEMA = [
+    # what the journal belongs to, so it is never resumed against a different export
+    '''CREATE TABLE IF NOT EXISTS journal_meta (
+    KEY text primary key,
+    VALUE text
+    )''',
+    # one row per course or instructor whose writes were all committed
+    '''CREATE TABLE IF NOT EXISTS committed (
+    KIND text,
+    NAME text,
+    ROWS int,
+    RUN int,
+    COMMITTED_AT real,
+    PRIMARY KEY (KIND, NAME)
+    )''',
+]
+
+class Journal:
+    # local record of an import's progress, written as batches are committed.
+    # Shared by every upload worker, so all access goes through one lock.
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in JOURNAL_SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.run = None
+
+    def start(self, export, resume):
+        # `export` identifies the files being imported. A fresh import forgets the previous one,
+        # a resumed one only continues a journal of the same export.
+        with self.lock:
+            row = self.conn.execute('SELECT VALUE FROM journal_meta WHERE KEY=?', ('export',)).fetchone()
+            if resume and row is not None and row[0] != export:
+                raise ValueError(f'the journal belongs to another export ({row[0]})')
+            if not resume:
+                self.conn.execute('DELETE FROM committed')
+            # every start is a new run, throughput is measured within one run
+            self.run = self.conn.execute('SELECT COALESCE(MAX(RUN), 0) + 1 FROM committed').fetchone()[0]
+            self.conn.execute('INSERT OR REPLACE INTO journal_meta (KEY, VALUE) VALUES (?, ?)', ('export', export))
+            self.conn.commit()
+
+    def committed(self, kind):
+        # => { name: rows } of everything of `kind` that is already in Firestore
+        with self.lock:
+            return dict(self.conn.execute('SELECT NAME, ROWS FROM committed WHERE KIND=?', (kind,)))
+
+    def record(self, marks):
+        # marks: [(kind, name, rows), ...] whose last write was part of a committed batch
+        if not marks:
+            return
+        now = time.time()
+        with self.lock:
+            self.conn.executemany('INSERT OR REPLACE INTO committed (KIND, NAME, ROWS, RUN, COMMITTED_AT) VALUES (?, ?, ?, ?, ?)',
+                                  [(kind, name, rows, self.run, now) for kind, name, rows in marks])
+            self.conn.commit()
+
+    def throughput(self, kind):
+        # rows/second of `kind` in the latest run that committed any, None until there is enough to tell
+        with self.lock:
+            count, rows, first, last = self.conn.execute(
+                '''SELECT COUNT(*), SUM(ROWS), MIN(COMMITTED_AT), MAX(COMMITTED_AT) FROM committed
+                WHERE KIND=? AND RUN=(SELECT MAX(RUN) FROM committed WHERE KIND=?)''', (kind, kind)).fetchone()
+        if count < 2 or last <= first:
+            return None
+        return rows / (last - first)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
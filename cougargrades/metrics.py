@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import datetime
+import functools
+import threading
+import contextlib
+try:
+    import resource
+except ImportError:
+    # Windows, peak RSS is reported as None
+    resource = None
+
+# Named spans around the phases of every stage, written out by --metrics, and the progress output --quiet turns off.
+#
+#   with metrics.span('copy rows') as s:
+#       s.rows += n                  rows processed, for rows/sec
+#       metrics.count('rpcs')        counters of the innermost open span, safe from any thread
+#
+# Spans nest, the innermost open one receives the counters and, once enabled, the timing of every statement
+# run on a connection opened by metrics.connect(). Worker processes keep their own spans, they are not reported.
+
+state = {
+    "enabled": False,
+    "quiet": False,
+    "started": time.time(),
+    "spans": [],
+    "stack": [],
+}
+lock = threading.Lock()
+
+# distinct statements timed per span, SQL built with literals (csv2db.py without --bulk) is lumped together after that
+MAX_STATEMENTS = 100
+
+def configure(enabled=False, quiet=False):
+    # enabled: record SQLite statement timings, spans are always recorded since they cost next to nothing
+    # quiet: no spinners or progress bars, for logs of non-interactive runs
+    state["enabled"] = enabled
+    state["quiet"] = quiet
+
+def peak_rss_mb():
+    # high-water mark of this process and its finished worker processes
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+class Span:
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.counters = {}
+        # normalized SQL => [calls, seconds]
+        self.statements = {}
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.rss_start = peak_rss_mb()
+        self.rss_end = None
+
+    def to_dict(self):
+        data = {
+            "name": self.name,
+            "seconds": self.seconds,
+            "rows": self.rows,
+            "rowsPerSecond": self.rows / self.seconds if self.rows and self.seconds else None,
+            # the process high-water mark when the span ended, and how much the span raised it
+            "peakRssMb": self.rss_end,
+            "peakRssGrowthMb": self.rss_end - self.rss_start if self.rss_end is not None else None,
+            "counters": self.counters,
+        }
+        data["statements"] = [
+            { "sql": sql, "calls": calls, "seconds": seconds }
+            for sql, (calls, seconds) in sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+        ]
+        return data
+
+@contextlib.contextmanager
+def span(name):
+    # spans are opened by the main thread, their name is the path of the spans they are nested in
+    with lock:
+        parent = state["stack"][-1].name + '/' if state["stack"] else ''
+        s = Span(parent + name)
+        state["spans"] += [s]
+        state["stack"] += [s]
+    try:
+        yield s
+    finally:
+        s.seconds = time.perf_counter() - s.start
+        s.rss_end = peak_rss_mb()
+        with lock:
+            state["stack"].remove(s)
+
+def timed(name):
+    # decorator, the function runs inside span `name`
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def count(counter, n=1):
+    with lock:
+        if state["stack"]:
+            counters = state["stack"][-1].counters
+            counters[counter] = counters.get(counter, 0) + n
+
+def record_statement(sql, seconds):
+    # statements are keyed by their whitespace-normalized text, cut short
+    key = ' '.join(sql.split())[:160]
+    with lock:
+        if state["stack"]:
+            statements = state["stack"][-1].statements
+            if key not in statements and len(statements) >= MAX_STATEMENTS:
+                key = '(other statements)'
+            entry = statements.setdefault(key, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+class TimedCursor(sqlite3.Cursor):
+    # time spent in execute(), the rows of a SELECT are stepped through afterwards and are not part of it
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record_statement(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record_statement(sql, time.perf_counter() - start)
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            record_statement(sql_script, time.perf_counter() - start)
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+def connect(database, **kwargs):
+    # sqlite3.connect(), timing every statement once metrics are enabled
+    return sqlite3.connect(database, factory=TimedConnection if state["enabled"] else sqlite3.Connection, **kwargs)
+
+class QuietSpinner:
+    # stands in for a Halo spinner, only the final message is printed
+    def __init__(self, text):
+        self.text = text
+
+    def start(self):
+        return self
+
+    def succeed(self, text=None):
+        print(text if text is not None else self.text)
+        return self
+
+    def fail(self, text=None):
+        print(text if text is not None else self.text)
+        return self
+
+    def stop(self):
+        return self
+
+def spinner(text):
+    if state["quiet"]:
+        return QuietSpinner(text)
+    from halo import Halo
+    return Halo(text=text, spinner='dots')
+
+def progress(**kwargs):
+    # a tqdm progress bar, disabled by --quiet
+    from tqdm import tqdm
+    return tqdm(disable=state["quiet"], **kwargs)
+
+def save(path, command=None):
+    # writes every span recorded so far to `path` as JSON
+    with lock:
+        spans = [s.to_dict() for s in state["spans"] if s.seconds is not None]
+    data = {
+        "version": 1,
+        "command": command if command is not None else os.path.basename(sys.argv[0]),
+        "argv": sys.argv[1:],
+        "started": datetime.datetime.fromtimestamp(state["started"]).isoformat(timespec='seconds'),
+        "seconds": time.time() - state["started"],
+        "peakRssMb": peak_rss_mb(),
+        "spans": spans,
+    }
+    with open(path, 'w') as f:
+        f.write(json.dumps(data, indent=2))
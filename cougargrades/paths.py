@@ -0,0 +1,32 @@
+import os
+import os.path
+
+# Files and folders every command agrees on, kept free of heavy imports
+
+def file_len(fname):
+    with open(fname) as f:
+        for i, l in enumerate(f):
+            pass
+    return i + 1
+
+def export_folders(folder, bundle=False):
+    # the folder of a db2jsonl.py export and its subfolders, a --bundle has no catalog/ or instructors/
+    return [folder] + [os.path.join(folder, name) for name in ['catalog', 'catalog_meta', 'instructors'] if not bundle or name == 'catalog_meta']
+
+def missing_folders(folder, bundle=False):
+    # => the export folders that are neither a directory nor an existing file
+    return [path for path in export_folders(folder, bundle) if not os.path.isdir(path) and not os.path.isfile(path)]
+
+def state_folder(folder=None, dbfile=None):
+    # the import journal and upload manifest live in the export, next to a records.db or in the current folder
+    if folder is not None:
+        return folder
+    if dbfile is not None:
+        return os.path.dirname(dbfile)
+    return '.'
+
+def journal_path(folder=None, dbfile=None):
+    return os.path.join(state_folder(folder, dbfile), 'import.journal')
+
+def manifest_path(folder=None, dbfile=None):
+    return os.path.join(state_folder(folder, dbfile), 'uploaded.json')
@@ -0,0 +1,31 @@
+import os.path
+import tempfile
+
+from cougargrades import database
+from cougargrades import export
+from cougargrades import upload
+from cougargrades import metrics
+from cougargrades.source import open_source, DatabaseSource
+
+# Every stage in one process:
+#   grades CSV files => records.db => JSONL export => Firestore
+# records.db is a temporary file unless it is kept, the JSONL export and the upload are both optional.
+# Without an export the upload streams its documents straight out of records.db.
+
+@metrics.timed('pipeline')
+def pipeline(csvfiles, dbfile=None, out=None, bundle=False, append=False, jobs=1, connect=None, upload_options=None):
+    #   dbfile: keep records.db at this path, an --append run only ingests new or changed CSV files into it
+    #   out: also write the JSONL export (a --bundle if `bundle`) to this folder, the upload then reads it
+    #   connect: upload through this Firestore client factory with `upload_options` (see upload.upload())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = dbfile if dbfile is not None else os.path.join(tmp, 'records.db')
+        database.build(csvfiles, path, single_pass=True, append=append, jobs=jobs)
+        if out is not None:
+            export.export(path, out, jobs=jobs, bundle=bundle)
+        if connect is None and upload_options is None:
+            return
+        source = open_source(out) if out is not None else DatabaseSource(path)
+        try:
+            upload.upload(source, connect, **upload_options)
+        finally:
+            source.close()
@@ -0,0 +1,54 @@
+import json
+
+from cougargrades import ingest
+
+def section_id(section):
+    # deterministic document ID of a section within its course, carried by the export as "id"
+    # (exports written before that are keyed the same way)
+    return section["id"] if "id" in section else ingest.section_id(section["term"], section["sectionNumber"])
+
+def plan_instructors(courses, get_instructor):
+    # computes the final `instructors` documents from an export, without reading Firestore
+    #   courses: iterable of courses, each one an iterable of JSONL lines (header first, then sections)
+    #   get_instructor: 'Last, First' => precomputed instructor document written by db2jsonl.py
+    # => { 'Last, First': document }, where courses are course IDs and sections are (course ID, section ID) pairs
+    plan = {}
+    for lines in courses:
+        lines = iter(lines)
+        header = json.loads(next(lines))
+        courseName = f'{header["department"]} {header["catalogNumber"]}'
+        for line in lines:
+            section = json.loads(line)
+            for item in section["instructorNames"]:
+                key = f'{item["lastName"]}, {item["firstName"]}'
+                doc = plan.get(key)
+                if doc is None:
+                    prof = get_instructor(key)
+                    doc = plan[key] = {
+                        "firstName": item["firstName"],
+                        "lastName": item["lastName"],
+                        "fullName": prof["fullName"],
+                        "courses": [],
+                        "keywords": prof["keywords"],
+                        "sections": [],
+                        "departments": {},
+                        "courses_count": 0,
+                        "sections_count": 0,
+                        "GPA": {
+                            "minimum": prof["GPA.minimum"],
+                            "maximum": prof["GPA.maximum"],
+                            "average": prof["GPA.average"],
+                            "median": prof["GPA.median"],
+                            "range": prof["GPA.range"],
+                            "standardDeviation": prof["GPA.standardDeviation"]
+                        }
+                    }
+                # every course is read in one go, so a course is new to an instructor unless it was the last one added
+                # `departments` counts the distinct courses taught in every department
+                if doc["courses"][-1:] != [courseName]:
+                    doc["courses"] += [courseName]
+                    doc["courses_count"] += 1
+                    doc["departments"][header["department"]] = doc["departments"].get(header["department"], 0) + 1
+                doc["sections"] += [(courseName, section_id(section))]
+                doc["sections_count"] += 1
+    return plan
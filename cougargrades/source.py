@@ -0,0 +1,134 @@
+import os
+import os.path
+import json
+import threading
+
+from cougargrades.paths import file_len
+from cougargrades.bundle import BundleReader, index_path
+from cougargrades.export import Export, connect
+
+# An export as the importer reads it, whichever form it takes. Every source offers:
+#   path              absolute path of the export, recorded in the import journal
+#   meta              contents of catalog_meta/meta.json
+#   keys()            course names ('COSC 1430') in export order
+#   count(key)        number of sections of a course
+#   lines(key)        JSONL lines of a course, header first
+#   courses()         lines of every course in key order, for passes over the whole export
+#   instructor(key)   instructor document of 'Last, First' as db2jsonl.py writes it, None if there is none
+#   close()
+
+class FolderSource:
+    # one file per course and instructor, written by db2jsonl.py
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.abspath(folder)
+        # every file in FOLDER/catalog/, in name order
+        self.names = sorted(os.listdir(path=os.path.join(folder, 'catalog')))
+        with open(os.path.join(folder, 'catalog_meta', 'meta.json'), 'r') as f:
+            self.meta = json.loads(f.read())
+
+    def keys(self):
+        return [name[:-len('.jsonl')] for name in self.names]
+
+    def count(self, key):
+        return file_len(os.path.join(self.folder, 'catalog', f'{key}.jsonl')) - 1 # line length (one row per line) minus the header
+
+    def lines(self, key):
+        with open(os.path.join(self.folder, 'catalog', f'{key}.jsonl'), 'r') as f:
+            yield from f
+
+    def courses(self):
+        return (self.lines(key) for key in self.keys())
+
+    def instructor(self, key):
+        if os.path.isfile(os.path.join(self.folder, 'instructors', f'{key}.json')):
+            with open(os.path.join(self.folder, 'instructors', f'{key}.json'), 'r') as f:
+                return json.loads(f.read())
+        else:
+            return None
+
+    def close(self):
+        pass
+
+class BundleSource:
+    # catalog.jsonl and instructors.jsonl written by db2jsonl.py --bundle, read through their indexes
+    def __init__(self, folder):
+        if not os.path.isfile(index_path(os.path.join(folder, 'catalog.jsonl'))) or not os.path.isfile(index_path(os.path.join(folder, 'instructors.jsonl'))):
+            raise ValueError(f'The bundle under {folder} is missing its catalog.jsonl.idx or instructors.jsonl.idx index')
+        self.path = os.path.abspath(folder)
+        self.catalog = BundleReader(os.path.join(folder, 'catalog.jsonl'))
+        self.instructors = BundleReader(os.path.join(folder, 'instructors.jsonl'))
+        with open(os.path.join(folder, 'catalog_meta', 'meta.json'), 'r') as f:
+            self.meta = json.loads(f.read())
+
+    def keys(self):
+        # the index already knows every course and its line count
+        return self.catalog.keys()
+
+    def count(self, key):
+        return self.catalog.count(key) - 1
+
+    def lines(self, key):
+        return iter(self.catalog.lines(key))
+
+    def courses(self):
+        return (self.lines(key) for key in self.keys())
+
+    def instructor(self, key):
+        # bundle keys are the file names without the extension
+        return json.loads(self.instructors.lines(key)[0]) if key in self.instructors else None
+
+    def close(self):
+        self.catalog.close()
+        self.instructors.close()
+
+class DatabaseSource:
+    # a records.db written by csv2db.py, documents are generated the way db2jsonl.py would write them
+    def __init__(self, dbfile):
+        self.path = os.path.abspath(dbfile)
+        self.export = Export(dbfile)
+        self.meta = self.export.catalog_meta
+        self.catalog = { f'{dept} {catalog_nbr}': (dept, catalog_nbr) for dept, catalog_nbr in self.export.unique_courses }
+        self.sections = None
+        self.instructors = None
+        # upload workers stream courses in parallel, each thread over a connection of its own
+        self.local = threading.local()
+
+    def keys(self):
+        return list(self.catalog)
+
+    def count(self, key):
+        if self.sections is None:
+            c = self.export.conn.cursor()
+            c.execute("SELECT DEPT, CATALOG_NBR, COUNT(DISTINCT TERM_CODE || '-' || CLASS_SECTION) FROM records GROUP BY DEPT, CATALOG_NBR")
+            self.sections = { f'{dept} {catalog_nbr}': n for dept, catalog_nbr, n in c }
+        return self.sections[key]
+
+    def lines(self, key):
+        if getattr(self.local, 'conn', None) is None:
+            self.local.conn = connect(self.export.dbfile)
+        dept, catalog_nbr = self.catalog[key]
+        return self.export.course(dept, catalog_nbr, self.local.conn)
+
+    def courses(self):
+        # one ordered query per department instead of one per course
+        return (lines for dept, catalog_nbr, lines in self.export.courses())
+
+    def instructor(self, key):
+        if self.instructors is None:
+            c = self.export.conn.cursor()
+            c.execute('SELECT DISTINCT INSTR_LAST_NAME, INSTR_FIRST_NAME FROM records')
+            self.instructors = { f'{last}, {first}': (first, last) for last, first in c }
+        name = self.instructors.get(key)
+        return self.export.instructor(*name) if name is not None else None
+
+    def close(self):
+        self.export.close()
+
+def open_source(path):
+    # a records.db, a db2jsonl.py --bundle export or a db2jsonl.py folder
+    if os.path.isfile(path):
+        return DatabaseSource(path)
+    if os.path.isfile(os.path.join(path, 'catalog.jsonl')):
+        return BundleSource(path)
+    return FolderSource(path)
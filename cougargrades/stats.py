@@ -0,0 +1,91 @@
+import math
+import statistics
+
+# one-pass GPA statistics (Welford), partial states from different shards can be merged
+class RunningStats:
+    def __init__(self, bin_width=None):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = None
+        self.maximum = None
+        # exact median keeps every value, otherwise values are counted in bins of `bin_width`
+        self.bin_width = bin_width
+        self.values = [] if bin_width is None else None
+        self.bins = {} if bin_width is not None else None
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.minimum = x if self.minimum is None or x < self.minimum else self.minimum
+        self.maximum = x if self.maximum is None or x > self.maximum else self.maximum
+        if self.values is not None:
+            self.values += [x]
+        else:
+            b = math.floor(x / self.bin_width)
+            self.bins[b] = self.bins.get(b, 0) + 1
+        return self
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        if self.bin_width != other.bin_width:
+            raise ValueError('cannot merge statistics with different median bins')
+        # https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Parallel_algorithm
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.minimum = other.minimum if self.minimum is None or other.minimum < self.minimum else self.minimum
+        self.maximum = other.maximum if self.maximum is None or other.maximum > self.maximum else self.maximum
+        if self.values is not None:
+            self.values += other.values
+        else:
+            for b, n in other.bins.items():
+                self.bins[b] = self.bins.get(b, 0) + n
+        return self
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0
+
+    def stdev(self):
+        return math.sqrt(max(self.variance(), 0))
+
+    def median(self):
+        if self.count == 0:
+            return None
+        if self.values is not None:
+            return statistics.median(self.values)
+        # middle of the bin(s) holding the middle value(s), clamped to the observed range
+        lo = self._bin_value((self.count - 1) // 2)
+        hi = self._bin_value(self.count // 2)
+        return (lo + hi) / 2
+
+    def _bin_value(self, index):
+        seen = 0
+        for b in sorted(self.bins):
+            seen += self.bins[b]
+            if seen > index:
+                return min(max((b + 0.5) * self.bin_width, self.minimum), self.maximum)
+
+    def to_dict(self):
+        if self.count == 0:
+            return {
+                "minimum": None,
+                "maximum": None,
+                "average": None,
+                "median": None,
+                "range": None,
+                "standardDeviation": None
+            }
+        return {
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "average": self.mean,
+            "median": self.median(),
+            "range": self.maximum - self.minimum,
+            "standardDeviation": self.stdev() if self.count > 1 else 0
+        }
@@ -0,0 +1,137 @@
+import csv
+import math
+import random
+import bisect
+import itertools
+
+# Deterministic grades CSVs in the FOIA layout of sample/sample.csv, at any scale, for benchmarks.
+# The same seed and row count always produce the same files. Sizes follow the shape of the real data:
+#   - a few departments and intro courses hold most of the sections (Zipf-like weights)
+#   - Summer terms are small, every course is taught by a handful of regular instructors
+#   - some sections are co-taught and listed once per instructor with the same grades
+#   - some rows are exact duplicates, some sections have no grades at all
+#   - names and titles carry the whitespace, apostrophes and commas the importer has to cope with
+
+HEADER = ["TERM","SUBJECT","CATALOG NBR","CLASS SECTION","COURSE DESCR","INSTR LAST NAME","INSTR FIRST NAME","A","B","C","D","F","TOTAL DROPPED","AVG GPA"]
+
+SUBJECTS = ['MATH', 'ENGL', 'BIOL', 'CHEM', 'COSC', 'PSYC', 'HIST', 'POLS', 'ECON', 'PHYS', 'ACCT', 'MANA', 'MARK', 'FINA',
+            'COMM', 'SPAN', 'ARTS', 'MUSI', 'KIN', 'NURS', 'ELEE', 'MECE', 'CIVE', 'CHEE', 'INDE', 'PHIL', 'SOCI', 'ANTH',
+            'GEOL', 'EDUC', 'HDFS', 'HRMA', 'ITEC', 'TECH', 'ENGI', 'STAT', 'FREN', 'GERM', 'ARAB', 'CHNS', 'JAPN', 'ITAL',
+            'RELS', 'CLAS', 'THEA', 'DANC', 'ARCH', 'INTD', 'OPTO', 'PHAR', 'NUTR', 'COUN', 'AAS', 'WGSS', 'ENRG', 'SCM']
+
+FIRST = ['Michael', 'Jennifer', 'David', 'Maria', 'Jose', 'Giulia', 'De-Hua', 'Mary Jane', 'Jerry Osagie', 'Kevin Bernard',
+         'Wei', 'Priya', 'Ahmed', 'Olga', 'Juan Carlos', 'Thi Thanh', 'Ada', 'Alan', 'Sarah', 'Robert', 'Linda', 'James',
+         'Nkechi', 'Hiroshi', 'Ana Lucia', 'Mohammad Reza', 'Emily', 'Daniel', 'Fatima', 'Sergei']
+LAST = ['Smith', 'Garcia', 'Nguyen', 'Johnson', 'Toti', 'Ebalunode', 'Han', 'Van Der Berg', 'Thompson', 'Walker', "O'Brien",
+        'Lee', 'Patel', 'Kim', 'Martinez', 'Rodriguez', 'Chen', 'Ivanova', 'Okafor', 'De La Cruz', 'Tanaka', 'Hernandez',
+        'Brown', 'Davis', 'Wilson', 'Anderson', 'Lopez', 'Gonzalez', 'Hassan', 'Zhang']
+
+TOPICS = ['Introduction to', 'Principles of', 'Fundamentals of', 'Topics in', 'Advanced', 'Seminar in', 'Research in',
+          'Methods of', 'Survey of', 'History of', "Writer's Workshop:", 'Special Problems,']
+FIELDS = ['Programming', 'Calculus', 'Composition', 'Organic Chemistry', 'Accounting', 'Data Structures', 'Statistics',
+          'Microeconomics', 'Thermodynamics', 'World Literature', 'Genetics', 'Marketing', 'Ethics', 'Design']
+
+SEASONS = [('Spring', 1.0), ('Summer', 0.35), ('Fall', 1.0)]
+
+# rows that repeat the row before them, sections without grades, co-taught sections (2 and 3 instructors)
+DUPLICATE_RATE = 0.003
+UNGRADED_RATE = 0.07
+COTAUGHT_RATES = [(3, 0.01), (2, 0.05)]
+
+def zipf_weights(n, s):
+    # cumulative weights of ranks 1..n, for bisect()
+    return list(itertools.accumulate(1 / (k ** s) for k in range(1, n + 1)))
+
+def pick(rng, cumulative):
+    return bisect.bisect_left(cumulative, rng.random() * cumulative[-1])
+
+def universe(rows, rng):
+    # departments, courses and instructors sized for `rows` rows
+    n_departments = min(200, max(5, round(math.sqrt(rows) / 4)))
+    n_courses = max(20, rows // 60)
+    n_instructors = max(20, rows // 25)
+    departments = SUBJECTS[:n_departments] + [f'X{k:03}' for k in range(n_departments - len(SUBJECTS))]
+    instructors = []
+    for i in range(n_instructors):
+        # a trailing space now and then, like the real files
+        last = rng.choice(LAST) + (' ' if rng.random() < 0.02 else '')
+        instructors += [(last, rng.choice(FIRST))]
+    department_weights = zipf_weights(len(departments), 1.1)
+    courses = []
+    numbers = {}
+    for c in range(n_courses):
+        dept = departments[pick(rng, department_weights)]
+        # unique catalog number within the department, lower levels are more common
+        while True:
+            number = f'{rng.choice([1, 1, 1, 2, 2, 3, 4, 6, 7, 8])}{rng.randint(100, 999)}'
+            if (dept, number) not in numbers:
+                break
+        numbers[(dept, number)] = True
+        title = f'{rng.choice(TOPICS)} {rng.choice(FIELDS)}' + (' ' if rng.random() < 0.05 else '')
+        # every course has a few regular instructors and a difficulty of its own
+        regulars = [rng.randrange(n_instructors) for _ in range(rng.randint(1, 4))]
+        courses += [(dept, number, title, regulars, rng.uniform(-0.6, 0.6))]
+    return courses, instructors
+
+def grades(rng, difficulty):
+    # A, B, C, D, F, TOTAL DROPPED, AVG GPA of a section of lognormal size
+    size = max(1, int(rng.lognormvariate(3.2, 0.6)))
+    shares = [rng.gammavariate(alpha, 1) for alpha in (3 + 2 * difficulty, 3, 2 - difficulty, 0.8, 0.8)]
+    total = sum(shares)
+    counts = [int(size * share / total) for share in shares]
+    graded = sum(counts)
+    dropped = int(size * rng.uniform(0, 0.15))
+    gpa = round((4 * counts[0] + 3 * counts[1] + 2 * counts[2] + counts[3]) / graded, 3) if graded > 0 else ''
+    return counts + [dropped, gpa]
+
+def generate(paths, rows, seed=1430, terms=30, start_year=2012):
+    # writes `rows` data rows spread over `terms` consecutive terms into `paths`, earlier terms into earlier files
+    # => rows written to every path
+    rng = random.Random(seed)
+    courses, instructors = universe(rows, rng)
+    course_weights = zipf_weights(len(courses), 0.8)
+    # course ranks are shuffled so the most popular courses are spread over departments
+    order = list(range(len(courses)))
+    rng.shuffle(order)
+    # Spring, Summer and Fall of every year from `start_year` on
+    term_list = [(f'{SEASONS[k % 3][0]} {start_year + k // 3}', SEASONS[k % 3][1]) for k in range(terms)]
+    total_weight = sum(weight for term, weight in term_list)
+    targets = [int(rows * weight / total_weight) for term, weight in term_list]
+    targets[-1] += rows - sum(targets)
+    written = []
+    k = 0
+    for i, path in enumerate(paths):
+        n = 0
+        with open(path, 'w', newline='') as f:
+            w = csv.writer(f, lineterminator='\n')
+            w.writerow(HEADER)
+            for term, weight in term_list[i * terms // len(paths):(i + 1) * terms // len(paths)]:
+                remaining = targets[k]
+                k += 1
+                # section numbers count up within every course and term
+                sections = {}
+                previous = None
+                while remaining > 0:
+                    if previous is not None and rng.random() < DUPLICATE_RATE:
+                        out = [previous]
+                    else:
+                        dept, number, title, regulars, difficulty = courses[order[pick(rng, course_weights)]]
+                        sections[(dept, number)] = sections.get((dept, number), 0) + 1
+                        teaching = 1
+                        roll = rng.random()
+                        for count, rate in COTAUGHT_RATES:
+                            if roll < rate:
+                                teaching = count
+                                break
+                        # mostly the regulars, sometimes anyone in the university
+                        people = [rng.choice(regulars) if rng.random() < 0.85 else rng.randrange(len(instructors)) for _ in range(teaching)]
+                        data = [''] * 7 if rng.random() < UNGRADED_RATE else grades(rng, difficulty)
+                        out = [[term, dept, number, sections[(dept, number)], title, *instructors[p], *data] for p in people]
+                    # the last section of a term is cut short to hit the row count exactly
+                    out = out[:remaining]
+                    w.writerows(out)
+                    previous = out[-1]
+                    remaining -= len(out)
+                    n += len(out)
+        written += [n]
+    return written
@@ -0,0 +1,263 @@
+import os
+import os.path
+import json
+import threading
+import datetime
+
+from cougargrades import metrics
+from cougargrades.batch import BatchWriter, TokenBucket, MAX_BATCH_SIZE
+from cougargrades.plan import plan_instructors, section_id
+from cougargrades.journal import Journal
+from cougargrades import delta
+
+# The jsonl2firestore.py stage: an export (see cougargrades.source) => Firestore
+
+def partition(items, weight, n):
+    # largest first onto the least loaded worker, so every worker ends up with about the same number of rows
+    # every part keeps the order of `items`
+    owner = {}
+    loads = [0] * n
+    for item in sorted(items, key=weight, reverse=True):
+        k = loads.index(min(loads))
+        owner[item] = k
+        loads[k] += weight(item)
+    parts = [[] for _ in range(n)]
+    for item in items:
+        parts[owner[item]] += [item]
+    return parts
+
+@metrics.timed('upload')
+def upload(source, connect, journal_path, manifest_path, since=None, resume=False, dry_run=False,
+           workers=1, rate=None, batch_size=MAX_BATCH_SIZE, skip_existing=False):
+    # imports `source` into Firestore, the options are the flags of jsonl2firestore.py
+    # connect() => the Firestore client, it is only called once a change set is ready to be written
+    # => the estimated cost of the change set, see delta.estimate()
+    spinner = metrics.spinner(f'Estimating number of entries to be processed ...')
+    spinner.start()
+    with metrics.span('count'):
+        keys = source.keys()
+        total = 0
+        for key in keys:
+            total += source.count(key)
+    spinner.succeed(text=f'{total} entries were counted in the provided .jsonl files')
+
+    # every instructor document is derived from the export up front and written once, after the sections
+    spinner = metrics.spinner(f'Planning instructor documents ...')
+    spinner.start()
+    with metrics.span('plan instructors') as planning:
+        plan = plan_instructors(source.courses(), source.instructor)
+        planning.rows = len(plan)
+    spinner.succeed(text=f'{len(plan)} instructor documents planned')
+
+    # what this upload has to write: everything, or what changed since the manifest of the last upload
+    with metrics.span('diff'):
+        metaLocal = source.meta
+        current = delta.snapshot(source.courses(), plan, metaLocal)
+        previous = None
+        if since is not None:
+            try:
+                previous = delta.load_manifest(since)
+            except (OSError, ValueError) as err:
+                raise ValueError(f'Cannot read --since manifest: {err}')
+            changes = delta.diff(previous, current)
+        else:
+            changes = delta.everything(current)
+        cost = delta.estimate(changes, batch_size, workers, skip_existing, previous)
+    print(f'{cost["sections"]} sections in {cost["courses"]} courses ({cost["headers"]} course documents), {cost["instructors"]} instructors and {"the" if changes["meta"] else "no"} catalog metadata to write')
+    if since is not None and any(changes["removed"].values()):
+        print(f'{changes["removed"]["courses"]} courses, {changes["removed"]["sections"]} sections and {changes["removed"]["instructors"]} instructors are no longer in the export, they are left in Firestore')
+
+    if dry_run:
+        print(f'Estimated Firestore usage: {cost["writes"]} writes, {cost["reads"]} reads in about {cost["rpcs"]} RPCs')
+        # the rate of the last journaled import, if there was one
+        last_rate = None
+        if os.path.isfile(journal_path):
+            journal = Journal(journal_path)
+            last_rate = journal.throughput('course')
+            journal.close()
+        if last_rate is not None and cost["sections"] > 0:
+            print(f'At {round(last_rate)} rows/s like the last import, that is about {datetime.timedelta(seconds=round(cost["sections"] / last_rate))} (h:mm:ss)')
+        return cost
+
+    # progress is journaled locally, so --resume never has to ask Firestore what is already there
+    journal = Journal(journal_path)
+    try:
+        journal.start(f'{source.path} ({delta.digest(current)} since {since})', resume)
+    except ValueError as err:
+        journal.close()
+        raise ValueError(f'Cannot resume: {err}')
+    committed_courses = journal.committed('course')
+    committed_instructors = journal.committed('instructor')
+    # rows of a course are the sections it has to write
+    sizes = { key: len(changes["courses"][key]["sections"]) for key in keys if key in changes["courses"] }
+    remaining_courses = [key for key in keys if key in sizes and key not in committed_courses]
+    remaining_rows = 0
+    for key in remaining_courses:
+        remaining_rows += sizes[key]
+    if resume:
+        rate_so_far = journal.throughput('course')
+        print(f'Resuming: {len(committed_courses)} of {len(sizes)} courses and {len(committed_instructors)} instructors were already committed, {remaining_rows} rows remain')
+        if rate_so_far is not None:
+            print(f'At {round(rate_so_far)} rows/s like last time, that is about {datetime.timedelta(seconds=round(remaining_rows / rate_so_far))} (h:mm:ss)')
+
+    db = connect()
+
+    catalog = db.collection(u'catalog')
+    instructors = db.collection(u'instructors')
+
+    print(f'📚 Writing {remaining_rows} sections to Firestore. Instructors will be populated.')
+
+    def upload_course(key, writer, progress):
+        # queues the writes of one course on `writer`, sections first and the course document last
+        # only the sections in the change set are written, the course document only if its header changed
+        change = changes["courses"][key]
+        wanted = set(change["sections"])
+        j = 0
+        # declare variable
+        sectionsRef = {}
+        courseRef = {}
+        courseMeta = {}
+        existing = set()
+        for line in source.lines(key):
+            # load json line as Dict
+            obj = json.loads(line)
+            if j == 0:
+                # block for creating course document
+                # get course reference
+                courseRef = catalog.document(f'{obj["department"]} {obj["catalogNumber"]}')
+                # update progress bar
+                progress(0, courseRef.id)
+                # the course document is written once its sections are counted
+                courseMeta = obj
+                sectionsRef = catalog.document(f'{obj["department"]} {obj["catalogNumber"]}').collection('sections')
+                if skip_existing:
+                    # one listing per course instead of one query per section
+                    existing = set(ref.id for ref in sectionsRef.list_documents())
+                    metrics.count('rpcs')
+                    metrics.count('reads', max(1, len(existing)))
+            else:
+                # sections are written under their deterministic ID, so writing one again only overwrites it
+                sid = section_id(obj)
+                obj.pop("id", None)
+                courseMeta["sectionCount"] += 1
+                if sid not in wanted:
+                    j += 1
+                    continue
+                if sid not in existing:
+                    # block for populating sections subcollection
+                    obj["instructors"] = []
+                    # for every intructor in the file
+                    for item in obj["instructorNames"]:
+                        # save instructor reference to section document, the instructor itself is written from the plan
+                        obj["instructors"] += [ instructors.document(f'{item["lastName"]}, {item["firstName"]}') ]
+                    # add section to course under its deterministic ID, the same one the plan refers to
+                    writer.set(sectionsRef.document(sid), obj)
+                progress(1)
+            j += 1
+        # sectionCount is the number of sections in the export, so re-running an import does not inflate it
+        # merge=True keeps the fields Cloud Functions compute on the course document
+        if change["header"]:
+            writer.set(courseRef, courseMeta, merge=True)
+        # journaled once the batch holding the course document is committed
+        writer.mark(('course', courseRef.id, sizes[key]))
+
+    def upload_instructor(key, writer):
+        doc = plan[key]
+        doc["courses"] = [catalog.document(courseName) for courseName in doc["courses"]]
+        doc["sections"] = [catalog.document(courseName).collection('sections').document(sid) for courseName, sid in doc["sections"]]
+        writer.set(instructors.document(key), doc)
+        writer.mark(('instructor', key, doc["sections_count"]))
+
+    # shared by every worker, so the write rate is limited for the whole import
+    limiter = TokenBucket(rate) if rate is not None else None
+    # set when a worker fails, the others stop after their current course
+    failed = threading.Event()
+
+    with metrics.progress(total=remaining_rows, unit="rows") as t:
+        lock = threading.Lock()
+        started = [0] # used in the progress bar description to indicate what course is being processed
+        uploaded = [0] # sections queued, the progress bar does not count while --quiet
+        def progress(n, course=None):
+            with lock:
+                if course is not None:
+                    started[0] += 1
+                    t.set_description(f'[{started[0]}/{len(remaining_courses)}] {course}')
+                uploaded[0] += n
+                t.update(n)
+
+        def run(items, upload_item):
+            # one worker: a BatchWriter of its own over its share of courses or instructors
+            with BatchWriter(db, size=batch_size, limiter=limiter, on_commit=journal.record) as writer:
+                for item in items:
+                    if failed.is_set():
+                        break
+                    try:
+                        upload_item(item, writer)
+                    except Exception:
+                        failed.set()
+                        raise
+            return writer.writes, writer.commits
+
+        def run_all(parts):
+            # => (writes, commits) of all workers, the first error of a worker is raised here
+            if len(parts) == 1:
+                return run(*parts[0])
+            import concurrent.futures
+            writes = 0
+            commits = 0
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(parts)) as pool:
+                futures = [pool.submit(run, *part) for part in parts]
+                for future in futures:
+                    w, c = future.result()
+                    writes += w
+                    commits += c
+            return writes, commits
+
+        # every course is owned by one worker, so its sections and course document never race each other
+        courseParts = partition(remaining_courses, lambda key: sizes[key], workers)
+        with metrics.span('courses') as writing:
+            writes, commits = run_all([(part, lambda key, writer: upload_course(key, writer, progress)) for part in courseParts])
+            writing.rows = uploaded[0]
+
+        # instructors are written after all sections, and every instructor document by exactly one worker
+        remaining_instructors = [key for key in changes["instructors"] if key not in committed_instructors]
+        t.write(f'Writing {len(remaining_instructors)} instructors ...')
+        instructorParts = partition(remaining_instructors, lambda key: plan[key]["sections_count"], workers)
+        with metrics.span('instructors') as writing:
+            w, c = run_all([(part, upload_instructor) for part in instructorParts])
+            writing.rows = len(remaining_instructors)
+        t.write(f'{writes + w} writes were committed in {commits + c} batches')
+
+    # Updating metadata
+    spinner = metrics.spinner(f'Merging local catalog metadata with Firestore ...')
+    spinner.start()
+
+    with metrics.span('catalog_meta'):
+        if changes["meta"]:
+            metaRef =  db.collection('catalog_meta').document('meta')
+            metaSnap = metaRef.get()
+            metrics.count('rpcs')
+            metrics.count('reads')
+            if not metaSnap.exists:
+                metaRef.set(metaLocal)
+                metrics.count('rpcs')
+                metrics.count('writes')
+            else:
+                metaSnap = metaSnap.to_dict()
+                # merging logic
+                if metaLocal["latestTerm"] > metaSnap["latestTerm"]:
+                    metaRef.set({
+                        "latestTerm":  metaLocal["latestTerm"]
+                    }, merge=True)
+                    metrics.count('rpcs')
+                    metrics.count('writes')
+                # in the future: merge other values as needed
+
+    spinner.succeed(text=f'Catalog metadata written')
+
+    # the next upload only has to write what changed after this one
+    delta.save_manifest(manifest_path, current)
+    print(f'Manifest of this upload saved, pass it to --since next time')
+
+    journal.close()
+    return cost
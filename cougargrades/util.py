@@ -1,5 +1,6 @@
 
 import itertools
+import functools
 
 # inspired by: https://medium.com/@ken11zer01/firebase-firestore-text-search-and-pagination-91a0df8131ef
 def createKeywords(name):
@@ -10,14 +11,44 @@ def createKeywords(name):
         arrName += [ curName ]
     return arrName
 
-def generateKeywords(firstName, lastName):
+def generateKeywords(firstName, lastName, maxKeywords=None, maxLength=None):
+    result = cachedKeywords(firstName, lastName)
+    if maxLength is not None:
+        result = [k for k in result if len(k) <= maxLength]
+    if maxKeywords is not None and len(result) > maxKeywords:
+        # keep the shortest keywords, they match the most searches
+        result = sorted(sorted(result, key=len)[:maxKeywords])
+    return list(result)
+
+# the same instructor is looked up once per section they taught
+@functools.lru_cache(maxsize=65536)
+def cachedKeywords(firstName, lastName):
     fullName = f'{firstName} {lastName}'
-    k = len(fullName.split(' ')) # number of "names", "John Robert Doe" => 3
-    permutations = generatePermutations(fullName) if k < 5 else generateConservativePermutations(firstName, lastName)
-    result = []
-    for p in permutations:
-        result += createKeywords(p)
-    return sorted(list(set(result)))
+    names = fullName.split(' ')
+    k = len(names) # number of "names", "John Robert Doe" => 3
+    if k >= 5:
+        result = []
+        for p in generateConservativePermutations(firstName, lastName):
+            result += createKeywords(p)
+        return tuple(sorted(set(result)))
+    # letters are lowercased one at a time like createKeywords(), a few characters change length when lowercased
+    lowered = [[letter.lower() for letter in name] for name in names]
+    result = set()
+    # walks every ordered selection of names once, so permutations that start the same share their prefixes
+    def walk(prefix, used, depth):
+        for i in range(len(lowered)):
+            if used & (1 << i):
+                continue
+            curName = prefix
+            if depth > 0:
+                curName += ' '
+                result.add(curName)
+            for letter in lowered[i]:
+                curName += letter
+                result.add(curName)
+            walk(curName, used | (1 << i), depth + 1)
+    walk('', 0, 0)
+    return tuple(sorted(result))
 
 # inspired by: https://stackoverflow.com/a/464882
 def generatePermutations(fullName):
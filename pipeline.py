@@ -0,0 +1,5 @@
+#!/usr/bin/env python3
+
+from cougargrades import cli
+
+cli.script('pipeline')
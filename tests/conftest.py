@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# the tests import the package from the repository, like the scripts do
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cougargrades import metrics
+
+@pytest.fixture(autouse=True)
+def quiet():
+    # no spinners or progress bars in test output
+    metrics.configure(quiet=True)
+    yield
+    metrics.configure()
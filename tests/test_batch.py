@@ -0,0 +1,98 @@
+import pytest
+from google.api_core import exceptions
+
+from cougargrades.batch import BatchWriter, TokenBucket, MAX_BATCH_SIZE
+from cougargrades.fakestore import FakeClient
+
+class FlakyClient(FakeClient):
+    # commits fail with `failures`, one per attempt, before they go through
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = list(failures)
+        self.attempts = 0
+
+    def batch(self):
+        batch = super().batch()
+        commit = batch.commit
+        def flaky():
+            self.attempts += 1
+            if self.failures:
+                raise self.failures.pop(0)
+            return commit()
+        batch.commit = flaky
+        return batch
+
+def test_writes_are_committed_in_batches():
+    db = FakeClient()
+    courses = db.collection('catalog')
+    with BatchWriter(db, size=10) as writer:
+        for i in range(25):
+            writer.set(courses.document(f'COSC {1300 + i}'), { "sectionCount": 0 })
+        # queued after the set() of the same document, so it lands in a later batch
+        writer.update(courses.document('COSC 1324'), { "sectionCount": 3 })
+    assert (writer.commits, writer.writes) == (3, 26)
+    assert db.stats() == { "rpcs": 3, "reads": 0, "writes": 26, "documents": 25 }
+    assert db.store['catalog/COSC 1324'] == { "sectionCount": 3 }
+
+def test_nothing_is_committed_after_an_error():
+    db = FakeClient()
+    with pytest.raises(RuntimeError):
+        with BatchWriter(db, size=10) as writer:
+            writer.set(db.collection('catalog').document('COSC 1430'), {})
+            raise RuntimeError('import failed')
+    assert db.stats()["rpcs"] == 0
+
+def test_marks_are_reported_once_committed():
+    db = FakeClient()
+    committed = []
+    writer = BatchWriter(db, size=2, on_commit=lambda marks: committed.append(list(marks)))
+    writer.set(db.collection('catalog').document('A'), {})
+    writer.mark('A')
+    assert committed == []
+    writer.set(db.collection('catalog').document('B'), {})
+    writer.set(db.collection('catalog').document('C'), {})
+    writer.mark('C')
+    writer.flush()
+    assert committed == [['A'], ['C']]
+
+def test_batch_size_is_checked():
+    for size in [0, MAX_BATCH_SIZE + 1]:
+        with pytest.raises(ValueError):
+            BatchWriter(FakeClient(), size=size)
+
+def test_rejected_commits_are_retried_and_throttle():
+    db = FlakyClient([exceptions.ResourceExhausted('slow down'), exceptions.ServiceUnavailable('unavailable')])
+    limiter = TokenBucket(1000)
+    writer = BatchWriter(db, backoff=0, limiter=limiter)
+    writer.set(db.collection('catalog').document('COSC 1430'), { "sectionCount": 1 })
+    writer.flush()
+    assert db.attempts == 3
+    assert writer.commits == 1
+    assert db.store['catalog/COSC 1430'] == { "sectionCount": 1 }
+    # halved once for the ResourceExhausted, grown back 5% by the commit that went through
+    assert limiter.rate == pytest.approx(500 * 1.05)
+
+def test_retries_give_up():
+    db = FlakyClient([exceptions.Aborted('contention')] * 3)
+    writer = BatchWriter(db, retries=2, backoff=0)
+    writer.set(db.collection('catalog').document('COSC 1430'), {})
+    with pytest.raises(exceptions.Aborted):
+        writer.flush()
+    assert db.attempts == 3
+
+def test_other_errors_are_not_retried():
+    db = FlakyClient([exceptions.InvalidArgument('bad document')])
+    writer = BatchWriter(db, backoff=0)
+    writer.set(db.collection('catalog').document('COSC 1430'), {})
+    with pytest.raises(exceptions.InvalidArgument):
+        writer.flush()
+    assert db.attempts == 1
+
+def test_token_bucket_recovers_up_to_its_rate():
+    limiter = TokenBucket(100, minimum=10)
+    for _ in range(10):
+        limiter.throttle()
+    assert limiter.rate == 10
+    for _ in range(100):
+        limiter.recover()
+    assert limiter.rate == 100
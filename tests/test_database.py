@@ -0,0 +1,156 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from cougargrades import database
+from cougargrades import synthetic
+from cougargrades.ingest import read_rows, split_file, parse_range
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+HEADER = 'TERM,SUBJECT,"CATALOG NBR","CLASS SECTION","COURSE DESCR","INSTR LAST NAME","INSTR FIRST NAME",A,B,C,D,F,"TOTAL DROPPED","AVG GPA"\n'
+
+def dump(dbfile):
+    conn = sqlite3.connect(dbfile)
+    lines = list(conn.iterdump())
+    conn.close()
+    return lines
+
+def test_split_file_keeps_quoted_newlines(tmp_path):
+    path = str(tmp_path / 'quoted.csv')
+    with open(path, 'w', newline='') as f:
+        f.write(HEADER)
+        f.write('"Fall 2013",ACCT,4105,1,"PPA ""Colloquium""\n1, again",Newman,"Michael Ray",1,2,3,4,5,6,2.5\n')
+        for i in range(2, 9):
+            f.write(f'"Fall 2013",ACCT,4105,{i},"Title",Newman,"Michael Ray",,,,,,,\r\n')
+    for size in [1, 2, 3, 100]:
+        ranges = split_file(path, size)
+        assert len(ranges) == -(-8 // size)
+        rows = [row for start, end in ranges for row in parse_range((path, start, end, True))[1]]
+        assert rows == list(read_rows(path, True))
+
+def test_split_file_of_header_only(tmp_path):
+    path = str(tmp_path / 'empty.csv')
+    with open(path, 'w') as f:
+        f.write(HEADER)
+    assert split_file(path, 10) == []
+
+@pytest.mark.parametrize('single_pass', [False, True])
+def test_jobs_match_one_process(tmp_path, single_pass):
+    csvfiles = [str(tmp_path / f'grades-{i}.csv') for i in range(3)]
+    synthetic.generate(csvfiles, 5000)
+    broken = str(tmp_path / 'broken.csv')
+    with open(broken, 'w') as f:
+        f.write(HEADER + '"Fall 2013",ACCT\n')
+    empty = str(tmp_path / 'empty.csv')
+    with open(empty, 'w') as f:
+        f.write(HEADER)
+    csvfiles = [csvfiles[0], os.path.join(DATA, 'grades.csv'), broken, empty, *csvfiles[1:]]
+
+    database.build(csvfiles, str(tmp_path / 'one.db'), single_pass=single_pass, bulk=True, chunk_size=700)
+    # ranges smaller than a file, so the files are split over several workers
+    database.build(csvfiles, str(tmp_path / 'jobs.db'), single_pass=single_pass, chunk_size=700, jobs=3)
+    assert dump(str(tmp_path / 'jobs.db')) == dump(str(tmp_path / 'one.db'))
+
+RECORDS = '''SELECT TERM, DEPT, CATALOG_NBR, CLASS_SECTION, COURSE_DESCR, INSTR_LAST_NAME, INSTR_FIRST_NAME,
+    A, B, C, D, F, Q, AVG_GPA, PROF_COUNT, PROF_AVG, PROF_MIN, PROF_MAX, TERM_CODE, GROUP_CODE, FIRESTORE_KEY FROM records'''
+
+def contents(dbfile, ordered=True):
+    # records and catalog_meta, in ID order or sorted when IDs are allowed to differ
+    conn = sqlite3.connect(dbfile)
+    rows = conn.execute(RECORDS + ' ORDER BY ID').fetchall()
+    meta = conn.execute('SELECT * FROM catalog_meta').fetchall()
+    conn.close()
+    return (rows if ordered else sorted(rows, key=repr)), meta
+
+@pytest.fixture
+def terms(tmp_path):
+    # three files of consecutive terms, like three FOIA releases
+    csvfiles = [str(tmp_path / f'grades-{i}.csv') for i in range(3)]
+    synthetic.generate(csvfiles, 6000, terms=9)
+    return csvfiles
+
+def test_append_matches_rebuild(tmp_path, terms):
+    full = str(tmp_path / 'full.db')
+    database.build(terms, full, single_pass=True)
+    appended = str(tmp_path / 'appended.db')
+    database.build(terms[:1], appended, append=True)
+    for path in terms[1:]:
+        assert database.build([path], appended, append=True) > 0
+    assert contents(appended) == contents(full)
+
+def test_append_skips_ingested_files(tmp_path, terms):
+    dbfile = str(tmp_path / 'records.db')
+    database.build(terms, dbfile, append=True)
+    before = dump(dbfile)
+    assert database.build(terms, dbfile, append=True) == 0
+    assert dump(dbfile) == before
+
+def test_append_replaces_changed_file(tmp_path, terms):
+    dbfile = str(tmp_path / 'records.db')
+    database.build(terms, dbfile, append=True)
+    # the latest release is corrected: rows dropped, the latest term included
+    with open(terms[2]) as f:
+        lines = f.readlines()
+    with open(terms[2], 'w') as f:
+        f.writelines(lines[:len(lines) // 2])
+    database.build(terms, dbfile, append=True)
+
+    full = str(tmp_path / 'full.db')
+    database.build(terms, full, single_pass=True)
+    assert contents(dbfile, ordered=False) == contents(full, ordered=False)
+
+def test_failed_append_keeps_replaced_rows(tmp_path, terms, monkeypatch):
+    dbfile = str(tmp_path / 'records.db')
+    database.build(terms, dbfile, append=True)
+    before = contents(dbfile)
+    with open(terms[1], 'a') as f:
+        f.write('"Fall 2030",ACCT,4105,1,"Title",Newman,"Michael Ray",1,2,3,4,5,6,2.5\n')
+
+    # the run dies after the replaced file's rows were deleted, before its new rows are in
+    def fail(csvfiles):
+        raise RuntimeError('killed')
+    monkeypatch.setattr(database, 'estimate_rows', fail)
+    with pytest.raises(RuntimeError):
+        database.build([terms[1]], dbfile, append=True)
+    assert contents(dbfile) == before
+
+def test_append_needs_manifest(tmp_path, terms):
+    dbfile = str(tmp_path / 'records.db')
+    database.build(terms[:1], dbfile)
+    with pytest.raises(ValueError):
+        database.build(terms[1:], dbfile, append=True)
+
+@pytest.fixture
+def releases(tmp_path):
+    # two releases in folders of their own, under the same file name
+    csvfiles = [str(tmp_path / f'release-{i}' / 'grades.csv') for i in range(2)]
+    for path in csvfiles:
+        os.mkdir(os.path.dirname(path))
+    synthetic.generate(csvfiles, 4000, terms=6)
+    return csvfiles
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_same_file_name_in_one_build(tmp_path, releases, jobs):
+    dbfile = str(tmp_path / 'records.db')
+    database.build(releases, dbfile, single_pass=True, jobs=jobs)
+    # the same releases under names of their own
+    renamed = [str(tmp_path / f'grades-{i}.csv') for i in range(2)]
+    for path, copy in zip(releases, renamed):
+        shutil.copyfile(path, copy)
+    full = str(tmp_path / 'full.db')
+    database.build(renamed, full, single_pass=True, jobs=jobs)
+    assert contents(dbfile) == contents(full)
+    conn = sqlite3.connect(dbfile)
+    assert conn.execute('SELECT NAME FROM source_files ORDER BY FIRST_ID').fetchall() == [(path,) for path in releases]
+    conn.close()
+
+def test_same_file_name_across_appends(tmp_path, releases):
+    dbfile = str(tmp_path / 'records.db')
+    for path in releases:
+        assert database.build([path], dbfile, append=True) > 0
+    full = str(tmp_path / 'full.db')
+    database.build(releases, full, single_pass=True)
+    assert contents(dbfile) == contents(full)
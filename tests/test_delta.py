@@ -0,0 +1,93 @@
+import os
+import json
+
+import pytest
+
+from cougargrades import delta
+from cougargrades import database
+from cougargrades import export
+from cougargrades import synthetic
+from cougargrades.fakestore import FakeClient
+from cougargrades.source import open_source
+from cougargrades.upload import upload
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+def course(header, *sections):
+    return [json.dumps(header)] + [json.dumps(section) for section in sections]
+
+HEADER = { "department": "COSC", "catalogNumber": "1430", "sectionCount": 0 }
+SECTION = { "id": "201803-1", "term": 201803, "sectionNumber": 1, "A": 10, "instructorNames": [] }
+PLAN = { "Toti, Giulia": { "sections": [("COSC 1430", "201803-1")] } }
+META = { "latestTerm": 201803 }
+
+def test_unchanged_export_has_nothing_to_write():
+    manifest = delta.snapshot([course(HEADER, SECTION)], PLAN, META)
+    changes = delta.diff(manifest, delta.snapshot([course(HEADER, SECTION)], PLAN, META))
+    assert changes == { "courses": {}, "instructors": [], "meta": False, "removed": { "courses": 0, "sections": 0, "instructors": 0 } }
+    assert delta.estimate(changes, 500, 4)["rpcs"] == 0
+
+def test_changed_and_new_sections():
+    before = delta.snapshot([course(HEADER, SECTION)], PLAN, META)
+    # a corrected section keeps the course document as it was
+    changed = delta.diff(before, delta.snapshot([course(HEADER, { **SECTION, "A": 11 })], PLAN, META))
+    assert changed["courses"] == { "COSC 1430": { "header": False, "sections": ["201803-1"] } }
+    # a new section changes the section count of the course document
+    added = delta.diff(before, delta.snapshot([course(HEADER, SECTION, { **SECTION, "id": "201901-1", "term": 201901 })], PLAN, { "latestTerm": 201901 }))
+    assert added["courses"] == { "COSC 1430": { "header": True, "sections": ["201901-1"] } }
+    assert added["meta"]
+
+def test_removed_documents_are_counted():
+    before = delta.snapshot([course(HEADER, SECTION, { **SECTION, "id": "201803-2", "sectionNumber": 2 }), course({ **HEADER, "catalogNumber": "1436" }, SECTION)], PLAN, META)
+    after = delta.snapshot([course(HEADER, SECTION)], {}, META)
+    assert delta.diff(before, after)["removed"] == { "courses": 1, "sections": 2, "instructors": 1 }
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / 'uploaded.json')
+    manifest = delta.snapshot([course(HEADER, SECTION)], PLAN, META)
+    delta.save_manifest(path, manifest)
+    assert delta.load_manifest(path) == manifest
+    delta.save_manifest(path, { **manifest, "version": delta.MANIFEST_VERSION + 1 })
+    with pytest.raises(ValueError):
+        delta.load_manifest(path)
+
+def export_of(tmp_path, name, csvfiles):
+    dbfile = str(tmp_path / f'{name}.db')
+    database.build(csvfiles, dbfile, single_pass=True)
+    folder = str(tmp_path / name)
+    export.export(dbfile, folder)
+    return folder
+
+def run(db, folder, tmp_path, name, since=None):
+    source = open_source(folder)
+    try:
+        return upload(source, lambda: db, journal_path=str(tmp_path / f'{name}.journal'), manifest_path=str(tmp_path / f'{name}.json'),
+                      since=since, batch_size=50)
+    finally:
+        source.close()
+
+def test_upload_since_matches_a_full_upload(tmp_path):
+    # the next release adds a term and corrects an older section
+    csvfiles = [str(tmp_path / f'grades-{i}.csv') for i in range(2)]
+    synthetic.generate(csvfiles, 3000, terms=6)
+    old = export_of(tmp_path, 'old', [os.path.join(DATA, 'grades.csv'), csvfiles[0]])
+    with open(os.path.join(DATA, 'grades.csv')) as f:
+        lines = f.readlines()
+    corrected = str(tmp_path / 'corrected.csv')
+    with open(corrected, 'w') as f:
+        f.writelines(lines[:-1] + [lines[-1].replace('15,10,2,0,0,1', '15,10,3,0,0,1')])
+    new = export_of(tmp_path, 'new', [corrected, *csvfiles])
+
+    db = FakeClient()
+    run(db, old, tmp_path, 'old')
+    before = db.stats()
+    cost = run(db, new, tmp_path, 'new', since=str(tmp_path / 'old.json'))
+    after = db.stats()
+
+    full = FakeClient()
+    run(full, new, tmp_path, 'full')
+    assert db.store == full.store
+    # the estimate is what the import cost, and a fraction of a full upload
+    assert after["writes"] - before["writes"] == cost["writes"]
+    assert after["rpcs"] - before["rpcs"] == cost["rpcs"]
+    assert cost["writes"] < full.writes
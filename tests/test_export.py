@@ -0,0 +1,149 @@
+import os
+import json
+import sqlite3
+
+import pytest
+
+from cougargrades import database
+from cougargrades import export
+from cougargrades import synthetic
+from cougargrades.ingest import section_id
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+def old_grouping(sections):
+    # the catalog/ loop of db2jsonl.py before the keyed pass, kept as the reference output
+    # `sections` are the rows of one course in ID order, like its `SELECT * FROM records WHERE DEPT=? AND CATALOG_NBR=?`
+    cache = []
+    for sec in sections:
+        data = {
+            "term": sec["TERM_CODE"],
+            "termString": sec["TERM"],
+            "sectionNumber": sec["CLASS_SECTION"],
+            "semesterGPA": sec["AVG_GPA"],
+            "A": sec["A"],
+            "B": sec["B"],
+            "C": sec["C"],
+            "D": sec["D"],
+            "F": sec["F"],
+            "Q": sec["Q"],
+            "instructorNames": []
+        }
+        dups = list(filter(lambda s: s["TERM_CODE"] == sec["TERM_CODE"] and s["CLASS_SECTION"] == sec["CLASS_SECTION"], sections))
+        countNames = lambda l, first, last: sum(1 if v["INSTR_FIRST_NAME"] == first and v["INSTR_LAST_NAME"] == last else 0 for v in l)
+        for j in range(len(dups)-1,0,-1):
+            if(countNames(dups, dups[j]["INSTR_FIRST_NAME"], dups[j]["INSTR_LAST_NAME"]) > 1):
+                dups.pop(j)
+        for d in dups:
+            data["instructorNames"] += [{
+                "firstName": d["INSTR_FIRST_NAME"],
+                "lastName": d["INSTR_LAST_NAME"],
+                "termGPAmin": d["PROF_MIN"],
+                "termGPAmax": d["PROF_MAX"],
+                "termGPA": d["PROF_AVG"],
+                "termSectionsTaught": d["PROF_COUNT"]
+            }]
+        cache += [data]
+    countSections = lambda l, term, secNum: sum(1 if v["term"] == term and v["sectionNumber"] == secNum else 0 for v in l)
+    for j in range(len(cache)-1,0,-1):
+        if(countSections(cache, cache[j]["term"], cache[j]["sectionNumber"]) > 1):
+            cache.pop(j)
+    # sections carry their document ID in front since the export gained it
+    return [{ "id": section_id(data["term"], data["sectionNumber"]), **data } for data in cache]
+
+def build(tmp_path, single_pass, rows=3000):
+    # records.db of the hand-written sample (co-taught, interleaved and repeated sections) and generated data
+    generated = str(tmp_path / 'generated.csv')
+    synthetic.generate([generated], rows)
+    dbfile = str(tmp_path / 'records.db')
+    database.build([os.path.join(DATA, 'grades.csv'), generated], dbfile, single_pass=single_pass)
+    return dbfile
+
+@pytest.mark.parametrize('single_pass', [False, True])
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_sections_match_old_grouping(tmp_path, single_pass, jobs):
+    dbfile = build(tmp_path, single_pass)
+    folder = str(tmp_path / 'export')
+    export.export(dbfile, folder, jobs=jobs)
+
+    conn = sqlite3.connect(dbfile)
+    conn.row_factory = sqlite3.Row
+    courses = conn.execute('SELECT DISTINCT DEPT, CATALOG_NBR FROM records ORDER BY DEPT, CATALOG_NBR').fetchall()
+    assert sorted(os.listdir(os.path.join(folder, 'catalog'))) == sorted(f'{dept} {catalog_nbr}.jsonl' for dept, catalog_nbr in courses)
+    for dept, catalog_nbr in courses:
+        sections = [dict(row) for row in conn.execute('SELECT * FROM records WHERE DEPT=? AND CATALOG_NBR=? ORDER BY ID', (dept, catalog_nbr))]
+        expected = ''.join(f'{json.dumps(data)}\n' for data in old_grouping(sections))
+        with open(os.path.join(folder, 'catalog', f'{dept} {catalog_nbr}.jsonl')) as f:
+            f.readline()
+            assert f.read() == expected, f'{dept} {catalog_nbr}'
+    conn.close()
+
+def test_co_taught_and_interleaved_sections(tmp_path):
+    dbfile = build(tmp_path, True, rows=10)
+    folder = str(tmp_path / 'export')
+    export.export(dbfile, folder)
+
+    with open(os.path.join(folder, 'catalog', 'COSC 1430.jsonl')) as f:
+        lines = [json.loads(line) for line in f]
+    assert lines[0]["sectionCount"] == 0
+    sections = { data["id"]: data for data in lines[1:] }
+    # one line per section, in order of the section's first row
+    assert [data["id"] for data in lines[1:]] == ['201803-1', '201803-2', '201803-3', '201901-1', '201803-4']
+    # the co-instructor listed after another section joins it, the repeated row of its instructor does not
+    assert [(i["lastName"], i["termSectionsTaught"]) for i in sections['201803-1']["instructorNames"]] == [('Toti', 3), ('Leiss', 1)]
+    assert [i["lastName"] for i in sections['201803-2']["instructorNames"]] == ['Ebalunode']
+    assert [i["lastName"] for i in sections['201901-1']["instructorNames"]] == ['Toti', 'Ebalunode']
+    assert sections['201803-3']["semesterGPA"] is None
+
+    with open(os.path.join(folder, 'catalog', 'MATH 1314.jsonl')) as f:
+        lines = [json.loads(line) for line in f]
+    assert lines[0]["description"] == 'College Algebra, Honors'
+    assert [(data["id"], [i["lastName"] for i in data["instructorNames"]]) for data in lines[1:]] == [
+        ('201803-10', ['Smith', 'Jones']),
+        ('201803-11', ['Smith', 'Jones']),
+        ('201901-10', ['Jones']),
+    ]
+
+def read_folder(folder):
+    # { relative path: contents } of every exported document
+    files = {}
+    for sub in ['catalog', 'instructors']:
+        for name in os.listdir(os.path.join(folder, sub)):
+            with open(os.path.join(folder, sub, name)) as f:
+                files[f'{sub}/{name}'] = f.read()
+    return files
+
+def test_incremental_rewrites_only_changed_documents(tmp_path):
+    csvfiles = [str(tmp_path / f'grades-{i}.csv') for i in range(2)]
+    synthetic.generate(csvfiles, 4000)
+    folder = str(tmp_path / 'export')
+    database.build(csvfiles, str(tmp_path / 'before.db'), single_pass=True)
+    export.export(str(tmp_path / 'before.db'), folder, incremental=True)
+    before = read_folder(folder)
+    # rewritten files get a new mtime
+    for path in before:
+        os.utime(os.path.join(folder, path), ns=(0, 0))
+
+    # one row less in the first file shifts the ID of every row after it
+    with open(csvfiles[0]) as f:
+        lines = f.readlines()
+    with open(csvfiles[0], 'w') as f:
+        f.writelines(lines[:2] + lines[3:])
+    database.build(csvfiles, str(tmp_path / 'after.db'), single_pass=True)
+    export.export(str(tmp_path / 'after.db'), folder, incremental=True)
+    after = read_folder(folder)
+    rewritten = set(path for path in after if os.stat(os.path.join(folder, path)).st_mtime_ns != 0)
+
+    # the incremental export is the full export, and only what differs was written
+    export.export(str(tmp_path / 'after.db'), str(tmp_path / 'full'))
+    assert after == read_folder(str(tmp_path / 'full'))
+    changed = set(path for path in after if before.get(path) != after[path])
+    assert 0 < len(changed) <= 3
+    assert rewritten == changed
+
+    # a plain export in between leaves fingerprints of what it wrote, so going back to before.db restores its export
+    export.export(str(tmp_path / 'before.db'), folder, incremental=True)
+    export.export(str(tmp_path / 'after.db'), folder)
+    export.export(str(tmp_path / 'before.db'), folder, incremental=True)
+    export.export(str(tmp_path / 'before.db'), str(tmp_path / 'clean'))
+    assert read_folder(folder) == read_folder(str(tmp_path / 'clean'))
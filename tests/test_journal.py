@@ -0,0 +1,103 @@
+import os
+
+import pytest
+from google.api_core import exceptions
+
+from cougargrades import database
+from cougargrades import export
+from cougargrades import synthetic
+from cougargrades.journal import Journal
+from cougargrades.fakestore import FakeClient
+from cougargrades.source import open_source
+from cougargrades.upload import upload
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+def test_committed_survives_reopening(tmp_path):
+    path = str(tmp_path / 'import.journal')
+    journal = Journal(path)
+    journal.start('export 1', resume=False)
+    journal.record([('course', 'COSC 1430', 5), ('instructor', 'Toti, Giulia', 0)])
+    journal.record([])
+    journal.close()
+
+    journal = Journal(path)
+    journal.start('export 1', resume=True)
+    assert journal.committed('course') == { 'COSC 1430': 5 }
+    assert journal.committed('instructor') == { 'Toti, Giulia': 0 }
+    journal.close()
+
+def test_resume_needs_the_same_export(tmp_path):
+    journal = Journal(str(tmp_path / 'import.journal'))
+    journal.start('export 1', resume=False)
+    journal.record([('course', 'COSC 1430', 5)])
+    with pytest.raises(ValueError):
+        journal.start('export 2', resume=True)
+    # a fresh import of another export starts over
+    journal.start('export 2', resume=False)
+    assert journal.committed('course') == {}
+    journal.close()
+
+def test_throughput_of_the_latest_run(tmp_path, monkeypatch):
+    journal = Journal(str(tmp_path / 'import.journal'))
+    journal.start('export 1', resume=False)
+    clock = iter([100.0, 110.0, 200.0, 202.0])
+    monkeypatch.setattr('cougargrades.journal.time.time', lambda: next(clock))
+    journal.record([('course', 'COSC 1430', 50)])
+    assert journal.throughput('course') is None
+    journal.record([('course', 'COSC 1436', 30)])
+    assert journal.throughput('course') == 8.0
+    # a resumed run is measured on its own
+    journal.start('export 1', resume=True)
+    journal.record([('course', 'MATH 1314', 10)])
+    journal.record([('course', 'MATH 2413', 20)])
+    assert journal.throughput('course') == 15.0
+    journal.close()
+
+class CrashingClient(FakeClient):
+    # the process dies with the commit after the first `commits` ones, like a killed import
+    def __init__(self, commits):
+        super().__init__()
+        self.left = commits
+
+    def batch(self):
+        batch = super().batch()
+        commit = batch.commit
+        def crashing():
+            if self.left is not None:
+                if self.left == 0:
+                    raise exceptions.InvalidArgument('killed')
+                self.left -= 1
+            return commit()
+        batch.commit = crashing
+        return batch
+
+def test_resumed_import_matches_a_clean_one(tmp_path):
+    generated = str(tmp_path / 'generated.csv')
+    synthetic.generate([generated], 2000)
+    dbfile = str(tmp_path / 'records.db')
+    database.build([os.path.join(DATA, 'grades.csv'), generated], dbfile, single_pass=True)
+    folder = str(tmp_path / 'export')
+    export.export(dbfile, folder)
+
+    def run(db, name, resume=False):
+        source = open_source(folder)
+        try:
+            upload(source, lambda: db, journal_path=str(tmp_path / f'{name}.journal'), manifest_path=str(tmp_path / f'{name}.json'),
+                   resume=resume, batch_size=20)
+        finally:
+            source.close()
+
+    clean = FakeClient()
+    run(clean, 'clean')
+
+    db = CrashingClient(30)
+    with pytest.raises(exceptions.InvalidArgument):
+        run(db, 'crashed')
+    assert 0 < len(db.store) < len(clean.store)
+    written = db.writes
+    db.left = None
+    run(db, 'crashed', resume=True)
+    assert db.store == clean.store
+    # only what was not journaled as committed is written again
+    assert db.writes - written < clean.writes
@@ -0,0 +1,83 @@
+import os
+import json
+
+from cougargrades import database
+from cougargrades import export
+from cougargrades import synthetic
+from cougargrades.plan import plan_instructors, section_id
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+def reference(courses, get_instructor):
+    # the instructor documents the original importer built in Firestore, one read-modify-write per section:
+    # set() on the first section, then ArrayUnion and Increment updates of courses, departments and sections
+    docs = {}
+    for lines in courses:
+        header = json.loads(lines[0])
+        courseName = f'{header["department"]} {header["catalogNumber"]}'
+        for line in lines[1:]:
+            section = json.loads(line)
+            for item in section["instructorNames"]:
+                key = f'{item["lastName"]}, {item["firstName"]}'
+                if key not in docs:
+                    prof = get_instructor(key)
+                    docs[key] = {
+                        "firstName": item["firstName"],
+                        "lastName": item["lastName"],
+                        "fullName": prof["fullName"],
+                        "courses": [courseName],
+                        "keywords": prof["keywords"],
+                        "sections": [],
+                        "departments": { header["department"]: 1 },
+                        "courses_count": 1,
+                        "sections_count": 0,
+                        "GPA": { name: prof[f'GPA.{name}'] for name in ["minimum", "maximum", "average", "median", "range", "standardDeviation"] }
+                    }
+                elif courseName not in docs[key]["courses"]:
+                    doc = docs[key]
+                    doc["courses"] += [courseName]
+                    doc["courses_count"] += 1
+                    doc["departments"][header["department"]] = doc["departments"].get(header["department"], 0) + 1
+            for item in section["instructorNames"]:
+                doc = docs[f'{item["lastName"]}, {item["firstName"]}']
+                if (courseName, section_id(section)) not in doc["sections"]:
+                    doc["sections"] += [(courseName, section_id(section))]
+                    doc["sections_count"] += 1
+    return docs
+
+def test_plan_matches_original_importer(tmp_path):
+    generated = str(tmp_path / 'generated.csv')
+    synthetic.generate([generated], 3000)
+    dbfile = str(tmp_path / 'records.db')
+    database.build([os.path.join(DATA, 'grades.csv'), generated], dbfile, single_pass=True)
+    folder = str(tmp_path / 'export')
+    export.export(dbfile, folder)
+
+    courses = []
+    for name in sorted(os.listdir(os.path.join(folder, 'catalog'))):
+        with open(os.path.join(folder, 'catalog', name)) as f:
+            courses += [f.readlines()]
+    def get_instructor(key):
+        with open(os.path.join(folder, 'instructors', f'{key}.json')) as f:
+            return json.loads(f.read())
+
+    plan = plan_instructors(courses, get_instructor)
+    assert plan == reference(courses, get_instructor)
+    # co-taught sections are listed under both instructors
+    assert ('COSC 1430', '201803-1') in plan['Leiss, Ernst']["sections"]
+    assert ('COSC 1430', '201803-1') in plan['Toti, Giulia']["sections"]
+    assert plan['Toti, Giulia']["courses"] == ['COSC 1430']
+
+def test_sections_without_id_are_keyed_the_same():
+    courses = [[
+        json.dumps({ "department": "COSC", "catalogNumber": "1430" }),
+        json.dumps({ "term": 201803, "sectionNumber": 1, "instructorNames": [{ "firstName": "Giulia", "lastName": "Toti" }] }),
+        json.dumps({ "id": "201803-2", "term": 201803, "sectionNumber": 2, "instructorNames": [{ "firstName": "Giulia", "lastName": "Toti" }] }),
+    ], [
+        json.dumps({ "department": "MATH", "catalogNumber": "1314" }),
+        json.dumps({ "term": 201901, "sectionNumber": 7, "instructorNames": [{ "firstName": "Giulia", "lastName": "Toti" }] }),
+    ]]
+    prof = { "fullName": "Giulia Toti", "keywords": [], **{ f'GPA.{name}': None for name in ["minimum", "maximum", "average", "median", "range", "standardDeviation"] } }
+    doc = plan_instructors(courses, lambda key: prof)['Toti, Giulia']
+    assert doc["sections"] == [('COSC 1430', '201803-1'), ('COSC 1430', '201803-2'), ('MATH 1314', '201901-7')]
+    assert (doc["courses_count"], doc["sections_count"], doc["departments"]) == (2, 3, { "COSC": 1, "MATH": 1 })
@@ -0,0 +1,73 @@
+import random
+import statistics
+
+import pytest
+
+from cougargrades.stats import RunningStats
+
+def gpas(n, seed=1430):
+    rng = random.Random(seed)
+    return [round(rng.uniform(0, 4), 3) for _ in range(n)]
+
+def reference(values):
+    # what db2jsonl.py computed with the statistics module before RunningStats
+    return {
+        "minimum": min(values),
+        "maximum": max(values),
+        "average": statistics.mean(values),
+        "median": statistics.median(values),
+        "range": max(values) - min(values),
+        "standardDeviation": statistics.stdev(values) if len(values) > 1 else 0
+    }
+
+def assert_close(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key in expected:
+        assert actual[key] == pytest.approx(expected[key], abs=1e-9), key
+
+@pytest.mark.parametrize('n', [1, 2, 7, 1000])
+def test_matches_statistics_module(n):
+    values = gpas(n)
+    acc = RunningStats()
+    for x in values:
+        acc.add(x)
+    assert_close(acc.to_dict(), reference(values))
+
+def test_merged_shards_match_one_pass():
+    values = gpas(1000)
+    whole = RunningStats()
+    for x in values:
+        whole.add(x)
+    shards = [RunningStats() for _ in range(4)]
+    for i, x in enumerate(values):
+        shards[i * 4 // len(values)].add(x)
+    merged = RunningStats()
+    for shard in shards + [RunningStats()]:
+        merged.merge(shard)
+    assert_close(merged.to_dict(), whole.to_dict())
+    assert merged.count == len(values)
+
+def test_binned_median_is_within_a_bin():
+    values = gpas(1001)
+    acc = RunningStats(bin_width=0.01)
+    for x in values:
+        acc.add(x)
+    assert acc.values is None
+    assert abs(acc.median() - statistics.median(values)) <= 0.01
+    assert acc.minimum <= acc.median() <= acc.maximum
+
+def test_empty():
+    assert RunningStats().to_dict() == {
+        "minimum": None,
+        "maximum": None,
+        "average": None,
+        "median": None,
+        "range": None,
+        "standardDeviation": None
+    }
+
+def test_merge_needs_the_same_bins():
+    exact = RunningStats().add(1.0)
+    binned = RunningStats(bin_width=0.01).add(2.0)
+    with pytest.raises(ValueError):
+        exact.merge(binned)
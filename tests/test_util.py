@@ -0,0 +1,47 @@
+import pytest
+
+from cougargrades import util
+
+# the keyword engine before caching and prefix sharing
+def reference(firstName, lastName):
+    fullName = f'{firstName} {lastName}'
+    k = len(fullName.split(' '))
+    permutations = util.generatePermutations(fullName) if k < 5 else util.generateConservativePermutations(firstName, lastName)
+    result = []
+    for p in permutations:
+        result += util.createKeywords(p)
+    return sorted(list(set(result)))
+
+NAMES = [
+    ('Giulia', 'Toti'),
+    ('Jerry Osagie', 'Ebalunode'),
+    ('De-Hua', 'Han'),
+    ('Mary Jane', 'Van Der Berg'),
+    ('Juan Carlos', 'De La Cruz'),
+    ('Ana', 'Ana'),
+    ('', 'Madonna'),
+    ('Pat', ''),
+    ('Michael  Ray', 'Newman'),
+    ('İsmail', 'Öztürk'),
+    ('ǅemal', 'ẞtraße'),
+]
+
+@pytest.mark.parametrize('first,last', NAMES)
+def test_matches_reference(first, last):
+    util.cachedKeywords.cache_clear()
+    assert util.generateKeywords(first, last) == reference(first, last)
+    # cached the second time, still the same
+    assert util.generateKeywords(first, last) == reference(first, last)
+
+def test_returned_list_is_a_copy():
+    keywords = util.generateKeywords('Giulia', 'Toti')
+    keywords.clear()
+    assert util.generateKeywords('Giulia', 'Toti') == reference('Giulia', 'Toti')
+
+def test_limits():
+    everything = util.generateKeywords('Jerry Osagie', 'Ebalunode')
+    assert util.generateKeywords('Jerry Osagie', 'Ebalunode', maxLength=4) == [k for k in everything if len(k) <= 4]
+    shortest = util.generateKeywords('Jerry Osagie', 'Ebalunode', maxKeywords=10)
+    assert len(shortest) == 10
+    assert shortest == sorted(shortest)
+    assert max(len(k) for k in shortest) <= min(len(k) for k in everything if k not in shortest)